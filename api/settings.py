@@ -80,6 +80,9 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # One transaction per request, so timeline events recorded by the
+        # model hooks are flushed with a single bulk insert on commit.
+        'ATOMIC_REQUESTS': True,
     }
 }
 
@@ -120,6 +123,16 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Uploads are stored once per distinct content, named by their SHA-256.
+STORAGES = {
+    'default': {
+        'BACKEND': 'rest_api.storage.ContentAddressedStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -131,8 +144,87 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',
     ),
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'rest_api.authentication.StatelessJWTAuthentication',
+    ),
+    'DEFAULT_THROTTLE_CLASSES': (
+        'rest_api.throttling.TokenBucketThrottle',
     ),
+    # Keyed by the view's throttle_scope, falling back to the class scope.
+    'DEFAULT_THROTTLE_RATES': {
+        'user': '1000/hour',
+        'bulk': '60/hour',
+        'login': '10/min',
+        'register': '5/hour',
+    },
+}
+
+# Threads hashing passwords for the async login/register views.
+PASSWORD_HASHER_WORKERS = 4
+
+# Processes hashing passwords for bulk user imports (None: one per CPU), and
+# how many rows are validated, hashed and inserted per batch.
+PASSWORD_IMPORT_PROCESSES = None
+USER_IMPORT_BATCH_SIZE = 500
+
+# Resumable document uploads: where partial files live, the chunk size
+# offered to clients and the largest accepted, and how long an idle
+# session is kept, in seconds.
+CHUNKED_UPLOAD_DIR = BASE_DIR / 'tmp' / 'uploads'
+CHUNKED_UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+CHUNKED_UPLOAD_MAX_CHUNK_SIZE = 64 * 1024 * 1024
+CHUNKED_UPLOAD_EXPIRY = 24 * 60 * 60
+
+# Let the web server send document downloads: None (Python streams the
+# file with sendfile where the WSGI server supports it), 'x-accel-redirect'
+# (nginx, with an internal location at DOWNLOAD_ACCEL_PREFIX aliased to
+# MEDIA_ROOT) or 'x-sendfile' (Apache mod_xsendfile, lighttpd).
+DOWNLOAD_OFFLOAD = None
+DOWNLOAD_ACCEL_PREFIX = '/protected/'
+
+# Profile picture variants (longest side in pixels), generated after upload
+# by a pool of THUMBNAIL_WORKERS threads.
+THUMBNAIL_SIZES = {'small': 64, 'medium': 256, 'large': 512}
+THUMBNAIL_WORKERS = 2
+
+# Timeline events are fanned out to the project's team members as
+# notifications once their transaction commits. With workers > 0 this runs
+# on a thread pool instead of in the committing request.
+NOTIFICATION_FANOUT_WORKERS = 0
+NOTIFICATION_BATCH_SIZE = 1000
+
+# Pub/sub behind the notification stream (SSE) and long-poll endpoints.
+# LocalBroker only reaches clients of the same process; with several ASGI
+# workers use {'BACKEND': 'rest_api.pubsub.SQLiteBroker',
+# 'OPTIONS': {'path': BASE_DIR / 'pubsub.sqlite3'}}.
+PUBSUB = {
+    'BACKEND': 'rest_api.pubsub.LocalBroker',
+}
+# Seconds between SSE keepalive comments, and the longest a long-poll waits.
+PUSH_KEEPALIVE = 15
+LONG_POLL_TIMEOUT = 25
+
+# Timeline events folded into the daily project rollups per transaction,
+# and the longest burndown (in days) one request may ask for.
+ROLLUP_BATCH_SIZE = 5000
+BURNDOWN_MAX_DAYS = 1830
+
+# Rows fetched per query while streaming project exports.
+EXPORT_CHUNK_SIZE = 2000
+
+# How often per-user request counts are written to RateLimit, in seconds.
+RATE_LIMIT_FLUSH_INTERVAL = 60
+
+# Entry of CACHES holding each user's project ids. Point it at a cache
+# shared by all workers (e.g. memcached) so removing a member takes effect
+# everywhere at once; a process-local cache only keeps entries 5 seconds.
+MEMBERSHIP_CACHE = 'default'
+
+# Read-through cache for project/task/document detail payloads. For a
+# cache shared by all workers point it at a memcached entry of CACHES:
+# {'BACKEND': 'rest_api.cache.DjangoCache', 'OPTIONS': {'alias': 'detail'}}
+DETAIL_CACHE = {
+    'BACKEND': 'rest_api.cache.LRUCache',
+    'OPTIONS': {'max_entries': 10000, 'timeout': 300},
 }
 
 SIMPLE_JWT = {
@@ -141,6 +233,16 @@ SIMPLE_JWT = {
     'SLIDING_TOKEN_LIFETIME': timedelta(days=30),
     'SLIDING_TOKEN_REFRESH_LIFETIME_LATE_USER': timedelta(days=1),
     'SLIDING_TOKEN_LIFETIME_LATE_USER': timedelta(days=30),
+    'TOKEN_OBTAIN_SERIALIZER': 'rest_api.serializer.ClaimsTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'rest_api.serializer.RevocableTokenRefreshSerializer',
+    'TOKEN_USER_CLASS': 'rest_api.authentication.ClaimsUser',
 }
 
+# Revoked token ids are checked in memory. Each worker picks up
+# revocations made by other workers every REVOCATION_SYNC_INTERVAL seconds
+# and drops expired ones every REVOCATION_PRUNE_INTERVAL seconds. Expired
+# rows are deleted by the prune_revoked_tokens command.
+REVOCATION_SYNC_INTERVAL = 5
+REVOCATION_PRUNE_INTERVAL = 60 * 60
+
 AUTH_USER_MODEL = "rest_api.CustomUser"
\ No newline at end of file
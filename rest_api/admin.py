@@ -8,5 +8,7 @@ admin.site.register(models.Profile)
 admin.site.register(models.Comment)
 admin.site.register(models.Document)
 admin.site.register(models.RateLimit)
+admin.site.register(models.RevokedToken)
+admin.site.register(models.StoredBlob)
 admin.site.register(models.TimelineEvent)
 admin.site.register(models.Notification)
\ No newline at end of file
@@ -0,0 +1,64 @@
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from .revocation import revocation_list
+
+
+class ClaimsRefreshToken(RefreshToken):
+    """Refresh token whose access tokens carry the claims ClaimsUser reads."""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token['email'] = user.email
+        token['is_staff'] = user.is_staff
+        return token
+
+
+class ClaimsUser(TokenUser):
+    """
+    Request user built from the access token claims (id, email, is_staff),
+    without loading the CustomUser row. Views that need the row query it.
+    """
+
+    def __str__(self):
+        return self.email
+
+    @cached_property
+    def id(self):
+        return int(self.token[api_settings.USER_ID_CLAIM])
+
+    @cached_property
+    def email(self):
+        return self.token.get('email', '')
+
+
+def revoke_token(token):
+    revocation_list.revoke(token[api_settings.JTI_CLAIM], datetime_from_epoch(token['exp']))
+
+
+def check_not_revoked(token):
+    if revocation_list.is_revoked(token[api_settings.JTI_CLAIM]):
+        raise InvalidToken(_('Token has been revoked'))
+
+
+class StatelessJWTAuthentication(JWTStatelessUserAuthentication):
+    """
+    JWT authentication that does not query the database per request: the
+    user comes from the token claims and revocation is checked in memory.
+
+    So deleting or deactivating a user does not end their access tokens:
+    they keep working until they expire (ACCESS_TOKEN_LIFETIME) unless
+    revoked. Refreshing checks the user row, and fails for them.
+    """
+
+    def get_validated_token(self, raw_token):
+        token = super().get_validated_token(raw_token)
+        check_not_revoked(token)
+        return token
@@ -0,0 +1,117 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+
+class BaseDetailCache:
+    """Read-through cache for serialized detail payloads."""
+
+    def __init__(self, timeout=300):
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_load(self, key, load):
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        self.misses += 1
+        value = load()
+        if value is not None:
+            self.set(key, value)
+        return value
+
+    def stats(self):
+        return {"backend": type(self).__name__, "hits": self.hits, "misses": self.misses}
+
+
+class LRUCache(BaseDetailCache):
+    """In-process LRU with a per-entry TTL. Each worker has its own copy."""
+
+    def __init__(self, max_entries=10000, timeout=300):
+        super().__init__(timeout)
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.timeout)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def stats(self):
+        return {**super().stats(), "entries": len(self._data)}
+
+
+class DjangoCache(BaseDetailCache):
+    """
+    Delegates to an entry of ``CACHES``, e.g. a PyMemcacheCache on a local
+    memcached so all workers share entries and invalidations.
+    """
+
+    def __init__(self, alias="default", timeout=300):
+        super().__init__(timeout)
+        self.alias = alias
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, value):
+        self.cache.set(key, value, self.timeout)
+
+    def delete(self, key):
+        self.cache.delete(key)
+
+
+_detail_cache = None
+_lock = threading.Lock()
+
+
+def get_detail_cache():
+    global _detail_cache
+    if _detail_cache is None:
+        with _lock:
+            if _detail_cache is None:
+                config = getattr(settings, "DETAIL_CACHE", {})
+                backend = import_string(config.get("BACKEND", "rest_api.cache.LRUCache"))
+                _detail_cache = backend(**config.get("OPTIONS", {}))
+    return _detail_cache
+
+
+def detail_key(model, pk):
+    return f"detail:{model._meta.model_name}:{pk}"
+
+
+def invalidate(model, pk):
+    key = detail_key(model, pk)
+    get_detail_cache().delete(key)
+    # A concurrent GET may re-cache the old row before this transaction commits.
+    transaction.on_commit(lambda: get_detail_cache().delete(key))
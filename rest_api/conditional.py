@@ -0,0 +1,53 @@
+import hashlib
+import json
+from calendar import timegm
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.cache import get_conditional_response, patch_vary_headers, quote_etag
+from django.utils.http import http_date
+
+
+def make_etag(*parts):
+    return quote_etag(hashlib.md5(json.dumps(parts, cls=DjangoJSONEncoder).encode()).hexdigest())
+
+
+def latest_event(events, partition=None):
+    """
+    (id, timestamp) of the newest event, read off the timeline indexes; with
+    a `(field, values)` partition, one indexed lookup per value.
+    """
+    if partition is not None:
+        field, values = partition
+        latest = (latest_event(events.filter(**{field: value})) for value in values)
+        return max(filter(None, latest), key=lambda row: (row[1], row[0]), default=None)
+    return events.order_by('-timestamp', '-id').values_list('id', 'timestamp').first()
+
+
+def conditional_get(request, build, etag, last_modified=None):
+    """
+    Answer 304 Not Modified when the client's validators still match,
+    otherwise build the response and attach ETag/Last-Modified to it.
+    """
+    last_modified = last_modified and timegm(last_modified.utctimetuple())
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = build()
+    if 200 <= response.status_code < 300 or response.status_code == 304:
+        response['ETag'] = etag
+        if last_modified:
+            response['Last-Modified'] = http_date(last_modified)
+        # Validators are computed per caller.
+        patch_vary_headers(response, ['Authorization'])
+    return response
+
+
+def conditional_list(request, events, build, *scope, partition=None):
+    """
+    Conditional GET for listings that only change when a timeline event is
+    recorded for them: the newest matching event is the version.
+    """
+    latest = latest_event(events, partition)
+    if latest is None:
+        return build()
+    etag = make_etag(request.get_full_path(), latest[0], *scope)
+    return conditional_get(request, build, etag, latest[1])
@@ -0,0 +1,142 @@
+import io
+import mimetypes
+import os
+import re
+from datetime import datetime, timezone
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.http import content_disposition_header, parse_http_date_safe
+
+from .conditional import conditional_get, make_etag
+from .streaming import ablocks, is_asgi
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeFile:
+    """
+    A file that ends at `end`. Offsets stay those of the underlying file, so
+    FileResponse computes the range's Content-Length and a WSGI server's
+    file_wrapper can still sendfile() from the file descriptor.
+    """
+
+    def __init__(self, file, start, end):
+        self.file = file
+        self.end = end
+        file.seek(start)
+
+    def read(self, size=-1):
+        remaining = max(self.end - self.file.tell(), 0)
+        if size is None or size < 0 or size > remaining:
+            size = remaining
+        return self.file.read(size)
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_END:
+            return self.file.seek(self.end + offset)
+        return self.file.seek(offset, whence)
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.file.tell()
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """
+    (start, end) of a single-range `Range` header, end exclusive. None when
+    the header is absent or not one byte range (the whole file is sent), and
+    ValueError when the range cannot be satisfied.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        start, end = max(size - int(last), 0), size
+    else:
+        start = int(first)
+        end = min(int(last) + 1, size) if last else size
+    if start >= size or start >= end:
+        raise ValueError(header)
+    return start, end
+
+
+def if_range_matches(request, etag, last_modified):
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == int(last_modified.timestamp())
+
+
+def content_type(filename):
+    return mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+
+def offload(response, name, path):
+    if settings.DOWNLOAD_OFFLOAD == 'x-accel-redirect':
+        response['X-Accel-Redirect'] = settings.DOWNLOAD_ACCEL_PREFIX + quote(name)
+    else:
+        response['X-Sendfile'] = path
+    return response
+
+
+def serve_file(request, storage, name, filename):
+    """
+    Respond with a stored file. Range requests get a 206 for one byte range
+    (If-Range permitting); conditional requests are answered with 304.
+    With DOWNLOAD_OFFLOAD set, the web server sends the bytes (and handles
+    ranges itself) and Python only writes the headers. Under ASGI the file
+    is otherwise streamed block by block from an async iterator.
+    """
+    path = storage.path(name)
+    stat = os.stat(path)
+    last_modified = datetime.fromtimestamp(int(stat.st_mtime), tz=timezone.utc)
+    etag = make_etag(name, stat.st_size, stat.st_mtime)
+
+    def build():
+        if settings.DOWNLOAD_OFFLOAD:
+            response = HttpResponse(content_type=content_type(filename))
+            response['Content-Disposition'] = f'attachment; filename="{quote(filename)}"'
+            return offload(response, name, path)
+
+        byte_range = None
+        if if_range_matches(request, etag, last_modified):
+            try:
+                byte_range = parse_range(request.headers.get('Range'), stat.st_size)
+            except ValueError:
+                response = HttpResponse(status=416)
+                response['Content-Range'] = f'bytes */{stat.st_size}'
+                return response
+
+        f = open(path, 'rb')
+        start, end = byte_range or (0, stat.st_size)
+        if byte_range is not None:
+            f = RangeFile(f, start, end)
+        status = 200 if byte_range is None else 206
+        if is_asgi(request):
+            # FileResponse would be read into memory before being sent.
+            response = StreamingHttpResponse(ablocks(f), content_type=content_type(filename), status=status)
+            response['Content-Length'] = end - start
+            response['Content-Disposition'] = content_disposition_header(True, filename)
+        else:
+            response = FileResponse(f, as_attachment=True, filename=filename, status=status)
+        if byte_range is not None:
+            response['Content-Range'] = f'bytes {start}-{end - 1}/{stat.st_size}'
+        response['Accept-Ranges'] = 'bytes'
+        return response
+
+    return conditional_get(request, build, etag, last_modified)
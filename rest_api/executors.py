@@ -0,0 +1,19 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+_executors = {}
+_lock = threading.Lock()
+
+
+def get(name, max_workers):
+    """
+    The process-wide thread pool called `name`, started on first use with
+    `max_workers` threads named after it.
+    """
+    executor = _executors.get(name)
+    if executor is None:
+        with _lock:
+            executor = _executors.get(name)
+            if executor is None:
+                executor = _executors[name] = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+    return executor
@@ -0,0 +1,97 @@
+import csv
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Comment, Document, Task, TimelineEvent
+from .streaming import abatches
+
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+def timeline_rows(project_id):
+    events = (
+        TimelineEvent.objects.filter(project_id=project_id)
+        .select_related('project', 'task', 'document', 'comment', 'user')
+        .order_by('timestamp', 'id')
+    )
+    for event in events.iterator(chunk_size=settings.EXPORT_CHUNK_SIZE):
+        yield {
+            'id': event.id,
+            'event_type': event.event_type,
+            'description': event.describe(),
+            'timestamp': event.timestamp,
+            'user': event.user_id,
+            'task': event.task_id,
+            'document': event.document_id,
+            'comment': event.comment_id,
+        }
+
+
+def values_rows(model, columns):
+    def rows(project_id):
+        queryset = model.objects.filter(project_id=project_id).order_by('id').values(*columns)
+        return queryset.iterator(chunk_size=settings.EXPORT_CHUNK_SIZE)
+    return rows
+
+
+# resource -> (CSV header, function yielding one dict per row)
+RESOURCES = {
+    'timeline': (
+        ['id', 'event_type', 'description', 'timestamp', 'user', 'task', 'document', 'comment'],
+        timeline_rows,
+    ),
+    'tasks': (
+        ['id', 'title', 'description', 'status', 'assignee'],
+        values_rows(Task, ['id', 'title', 'description', 'status', 'assignee']),
+    ),
+    'documents': (
+        ['id', 'name', 'description', 'version', 'file'],
+        values_rows(Document, ['id', 'name', 'description', 'version', 'file']),
+    ),
+    'comments': (
+        ['id', 'text', 'author', 'task', 'created_at'],
+        values_rows(Comment, ['id', 'text', 'author', 'task', 'created_at']),
+    ),
+}
+
+
+class Echo:
+    """File-like object whose write() hands the line back to csv.writer's caller."""
+
+    def write(self, value):
+        return value
+
+
+def encode_ndjson(header, rows):
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder) + '\n'
+
+
+def encode_csv(header, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow([row[column] for column in header])
+
+
+ENCODERS = {
+    'ndjson': encode_ndjson,
+    'csv': encode_csv,
+}
+
+
+def export_lines(resource, fmt, project_id):
+    """Lazily encoded lines of one project's resource; nothing is read until iterated."""
+    header, rows = RESOURCES[resource]
+    return ENCODERS[fmt](header, rows(project_id))
+
+
+async def aexport_lines(resource, fmt, project_id):
+    """export_lines() for ASGI: one chunk of rows read and encoded per step."""
+    async for lines in abatches(export_lines(resource, fmt, project_id), settings.EXPORT_CHUNK_SIZE):
+        yield ''.join(lines)
@@ -0,0 +1,61 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+
+from . import executors
+
+_process_pool = None
+_process_count = None
+_lock = threading.Lock()
+
+
+def get_executor():
+    """
+    Pool that runs password hashing off the event loop. PBKDF2 releases
+    the GIL, so threads hash in parallel; PASSWORD_HASHER_WORKERS bounds how
+    many run at once.
+    """
+    return executors.get("hasher", settings.PASSWORD_HASHER_WORKERS)
+
+
+async def ahash_password(raw_password):
+    return await asyncio.get_running_loop().run_in_executor(get_executor(), make_password, raw_password)
+
+
+async def acheck_password(raw_password, encoded):
+    return await asyncio.get_running_loop().run_in_executor(get_executor(), check_password, raw_password, encoded)
+
+
+def get_process_pool():
+    """
+    Worker processes for hashing whole batches, as in the bulk user import.
+    Each worker sets up Django once so make_password sees PASSWORD_HASHERS.
+    Workers are started by a fork server (or spawned), never forked from
+    this process: its other threads may hold locks a fork would copy held.
+    """
+    global _process_pool, _process_count
+    if _process_pool is None:
+        with _lock:
+            if _process_pool is None:
+                _process_count = settings.PASSWORD_IMPORT_PROCESSES or os.cpu_count() or 1
+                method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+                _process_pool = ProcessPoolExecutor(
+                    max_workers=_process_count, mp_context=multiprocessing.get_context(method), initializer=django.setup
+                )
+    return _process_pool
+
+
+def hash_passwords(raw_passwords):
+    """Hash a batch of passwords across the process pool, preserving order."""
+    raw_passwords = list(raw_passwords)
+    if not raw_passwords:
+        return []
+    pool = get_process_pool()
+    chunksize = max(1, len(raw_passwords) // (_process_count * 4))
+    return list(pool.map(make_password, raw_passwords, chunksize=chunksize))
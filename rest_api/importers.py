@@ -0,0 +1,133 @@
+import csv
+import json
+from itertools import islice
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models.functions import Lower
+
+from .hashing import hash_passwords
+from .models import CustomUser, Profile
+
+FORMATS = ('csv', 'jsonl')
+
+USER_FIELDS = ('email', 'username')
+PROFILE_FIELDS = ('status', 'contact_number')
+
+
+def guess_format(filename):
+    return 'jsonl' if filename.lower().endswith(('.jsonl', '.ndjson')) else 'csv'
+
+
+def read_rows(stream, fmt):
+    """
+    Yield (row number, row dict) from a text stream of CSV with a header
+    line, or of one JSON object per line. Rows are read lazily so a large
+    file is never held in memory. Unparseable lines yield None as the row.
+    """
+    if fmt == 'csv':
+        for number, row in enumerate(csv.DictReader(stream), start=2):
+            yield number, row
+        return
+    for number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield number, row if isinstance(row, dict) else None
+
+
+def clean_row(row):
+    """
+    Return (user kwargs, profile kwargs, password, errors) for one row.
+    Each value goes through its model field's clean(), so the field
+    validators (check_phone_number for contact_number) apply as in the API.
+    """
+    errors = {}
+    values = {}
+    for model, names in ((CustomUser, USER_FIELDS), (Profile, PROFILE_FIELDS)):
+        for name in names:
+            value = row.get(name)
+            value = str(value).strip() if value is not None else ''
+            field = model._meta.get_field(name)
+            if not value and field.null:
+                values[name] = None
+                continue
+            try:
+                values[name] = field.clean(value, None)
+            except ValidationError as e:
+                errors[name] = e.messages
+    password = row.get('password')
+    password = str(password) if password not in (None, '') else None
+    if not password:
+        errors['password'] = ['This field is required.']
+    if 'email' in values:
+        values['email'] = CustomUser.objects.normalize_email(values['email'])
+    user = {name: values.get(name) for name in USER_FIELDS}
+    profile = {name: values.get(name) for name in PROFILE_FIELDS}
+    return user, profile, password, errors
+
+
+def import_users(rows, batch_size=None):
+    """
+    Create users and their profiles from (row number, row dict) pairs.
+
+    Rows are validated, their passwords hashed across the process pool and
+    the users and profiles inserted with one bulk_create each, batch by
+    batch, so a bad row only costs its own entry in the report. Each batch
+    commits on its own. Returns {'created': n, 'errors': [...]} where every
+    error names the source row.
+    """
+    batch_size = batch_size or settings.USER_IMPORT_BATCH_SIZE
+    report = {'created': 0, 'errors': []}
+    seen = set()
+    rows = iter(rows)
+    while batch := list(islice(rows, batch_size)):
+        report['created'] += import_batch(batch, seen, report['errors'])
+    return report
+
+
+def import_batch(batch, seen, errors):
+    pending = []
+    for number, row in batch:
+        if row is None:
+            errors.append({'row': number, 'errors': {'non_field_errors': ['Invalid row.']}})
+            continue
+        user, profile, password, row_errors = clean_row(row)
+        email = user['email']
+        if email and email.lower() in seen:
+            row_errors.setdefault('email', []).append('Duplicate email in this file.')
+        if row_errors:
+            errors.append({'row': number, 'errors': row_errors})
+            continue
+        seen.add(email.lower())
+        pending.append((number, user, profile, password))
+
+    # Emails differing only in case belong to the same person.
+    taken = set(
+        CustomUser.objects.annotate(email_lower=Lower('email')).filter(
+            email_lower__in=[user['email'].lower() for _, user, _, _ in pending]
+        ).values_list('email_lower', flat=True)
+    )
+    if taken:
+        for number, user, _, _ in pending:
+            if user['email'].lower() in taken:
+                errors.append({'row': number, 'errors': {'email': ['user with this email already exists.']}})
+        pending = [entry for entry in pending if entry[1]['email'].lower() not in taken]
+    if not pending:
+        return 0
+
+    hashes = hash_passwords(password for _, _, _, password in pending)
+    users = [
+        CustomUser(password=encoded, **user)
+        for (_, user, _, _), encoded in zip(pending, hashes)
+    ]
+    with transaction.atomic():
+        CustomUser.objects.bulk_create(users)
+        Profile.objects.bulk_create(
+            Profile(user=user, **profile) for user, (_, _, profile, _) in zip(users, pending)
+        )
+    return len(users)
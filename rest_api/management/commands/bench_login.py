@@ -0,0 +1,50 @@
+import asyncio
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from rest_api.views import login_user_async
+from rest_api.throttling import TokenBucketThrottle
+from django.test import AsyncRequestFactory
+
+
+class Command(BaseCommand):
+    help = "Benchmark the async login view against an existing account, without the CRUD endpoints."
+
+    def add_arguments(self, parser):
+        parser.add_argument("email")
+        parser.add_argument("password")
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--concurrency", type=int, default=20)
+
+    def handle(self, *args, **options):
+        # Keep the login throttle out of the measurement.
+        TokenBucketThrottle.allow_request = lambda self, request, view: True
+        latencies, statuses, elapsed = asyncio.run(self.run(options))
+        latencies.sort()
+        self.stdout.write(
+            f"{options['requests']} logins, concurrency {options['concurrency']}: "
+            f"{options['requests'] / elapsed:.1f} req/s, "
+            f"p50 {statistics.median(latencies) * 1000:.1f} ms, "
+            f"p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:.1f} ms, "
+            f"statuses {sorted(set(statuses))}"
+        )
+
+    async def run(self, options):
+        factory = AsyncRequestFactory()
+        body = json.dumps({"email": options["email"], "password": options["password"]})
+        semaphore = asyncio.Semaphore(options["concurrency"])
+
+        async def login():
+            async with semaphore:
+                started = time.perf_counter()
+                request = factory.post("/api/async/login/", body, content_type="application/json")
+                response = await login_user_async(request)
+                return time.perf_counter() - started, response.status_code
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*(login() for _ in range(options["requests"])))
+        elapsed = time.perf_counter() - started
+        return [latency for latency, _ in results], [code for _, code in results], elapsed
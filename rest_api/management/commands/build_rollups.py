@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from rest_api import rollups
+
+
+class Command(BaseCommand):
+    help = "Fold timeline events recorded since the last run into the daily project rollups."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, help="Events per transaction (default ROLLUP_BATCH_SIZE).")
+
+    def handle(self, *args, **options):
+        processed = rollups.build(options["batch_size"])
+        self.stdout.write(f"Rolled up {processed} events, up to event {rollups.version()}")
@@ -0,0 +1,31 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from rest_api.importers import FORMATS, guess_format, import_users, read_rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Create users and profiles from a CSV (with a header line) or JSONL file "
+        "with email, username, password, status and contact_number."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--format", choices=FORMATS, help="Defaults to the file extension.")
+        parser.add_argument("--batch-size", type=int)
+        parser.add_argument("--report", help="Write the per-row error report to this file as JSON.")
+
+    def handle(self, *args, **options):
+        fmt = options["format"] or guess_format(options["path"])
+        with open(options["path"], newline="", encoding="utf-8-sig") as stream:
+            report = import_users(read_rows(stream, fmt), batch_size=options["batch_size"])
+
+        if options["report"]:
+            with open(options["report"], "w") as out:
+                json.dump(report, out, indent=2)
+        else:
+            for error in report["errors"]:
+                self.stderr.write(f"row {error['row']}: {json.dumps(error['errors'])}")
+        self.stdout.write(f"{report['created']} users created, {len(report['errors'])} rows rejected")
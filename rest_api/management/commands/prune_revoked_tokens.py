@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from rest_api.models import RevokedToken
+
+
+class Command(BaseCommand):
+    help = "Delete revoked tokens that have expired and so can no longer be presented."
+
+    def handle(self, *args, **options):
+        deleted, _ = RevokedToken.objects.filter(expires_at__lte=timezone.now()).delete()
+        self.stdout.write(f"Deleted {deleted} expired revoked tokens")
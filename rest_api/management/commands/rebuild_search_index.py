@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from rest_api import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index of tasks, documents and comments."
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            count = search.rebuild()
+        self.stdout.write(f"Indexed {count} rows")
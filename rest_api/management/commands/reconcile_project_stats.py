@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from rest_api.models import ProjectStats
+
+
+class Command(BaseCommand):
+    help = "Recompute the per-project dashboard counters from the task, document and comment tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument("project_ids", nargs="*", type=int, help="Defaults to every project.")
+
+    def handle(self, *args, **options):
+        project_ids = options["project_ids"] or None
+        columns = [field.attname for field in ProjectStats._meta.concrete_fields if field.name != "last_activity"]
+        with transaction.atomic():
+            existing = ProjectStats.objects.all() if project_ids is None else ProjectStats.objects.filter(project_id__in=project_ids)
+            before = {row[0]: row for row in existing.values_list(*columns)}
+            rows = ProjectStats.objects.recount(project_ids)
+        drifted = [
+            stats.project_id for stats in rows
+            if before.get(stats.project_id) != tuple(getattr(stats, column) for column in columns)
+        ]
+        self.stdout.write(f"Recounted {len(rows)} projects, {len(drifted)} had drifted")
+        if drifted:
+            self.stdout.write(f"Drifted: {drifted[:50]}")
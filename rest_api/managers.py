@@ -1,4 +1,15 @@
+import weakref
+
 from django.contrib.auth.models import BaseUserManager
+from django.db import models, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from django.dispatch import Signal
+
+# Sent with the saved TimelineEvents each time the timeline is written,
+# after the surrounding transaction (if any) has committed.
+events_recorded = Signal()
 
 
 class UserManager(BaseUserManager):
@@ -16,4 +27,143 @@ class UserManager(BaseUserManager):
         kwargs.setdefault("is_staff", True)
         kwargs.setdefault("is_superuser", True)
 
-        return self.create_user(email, password, **kwargs)
\ No newline at end of file
+        return self.create_user(email, password, **kwargs)
+
+
+class TaskQuerySet(models.QuerySet):
+    def filter_listing(self, status=None, assignee_id=None, title_prefix=None):
+        """
+        The task list filters, each an equality or range condition that one
+        of the task indexes answers: (project, status, id), the unique
+        assignee index and (project, title, id).
+        """
+        tasks = self
+        if status:
+            tasks = tasks.filter(status__in=status) if isinstance(status, (list, tuple)) else tasks.filter(status=status)
+        if assignee_id is not None:
+            tasks = tasks.filter(assignee_id=assignee_id)
+        if title_prefix:
+            # A half-open range rather than LIKE 'prefix%': SQLite's LIKE is
+            # case-insensitive and so cannot use the title index.
+            tasks = tasks.filter(title__gte=title_prefix)
+            upper = prefix_upper_bound(title_prefix)
+            if upper is not None:
+                tasks = tasks.filter(title__lt=upper)
+        return tasks
+
+
+def prefix_upper_bound(prefix):
+    """
+    The smallest string above every string starting with `prefix`, in code
+    point order, or None when there is none (a prefix of U+10FFFF only).
+    """
+    while prefix:
+        code = ord(prefix[-1]) + 1
+        if code == 0xD800:
+            # Surrogates cannot be stored; they sort between these two.
+            code = 0xE000
+        if code <= 0x10FFFF:
+            return prefix[:-1] + chr(code)
+        prefix = prefix[:-1]
+    return None
+
+
+class TimelineEventBuffer:
+    """Events recorded inside one transaction (or savepoint), flushed on commit."""
+
+    def __init__(self, manager):
+        self.manager = manager
+        self.events = []
+        self.flushed = False
+
+    def __call__(self):
+        self.flushed = True
+        if self.events:
+            self.manager.flush(self.events)
+
+
+class TimelineEventManager(models.Manager):
+    def record(self, **kwargs):
+        self.record_many([self.model(**kwargs)])
+
+    def record_many(self, events):
+        connection = transaction.get_connection(self.db)
+        if not connection.in_atomic_block:
+            self.flush(events)
+            return
+        self._buffer(connection).events.extend(events)
+
+    def flush(self, events):
+        self.bulk_create(events)
+        events_recorded.send(sender=self.model, events=events)
+
+    def _buffer(self, connection):
+        # One buffer per savepoint, registered with on_commit once. Only that
+        # registration keeps it alive: when Django drops it with a rolled
+        # back savepoint or transaction, or runs it on commit, the weak
+        # reference here goes too and the next event starts a new buffer.
+        # One that is being (or has been) flushed takes no more events.
+        buffers = getattr(connection, 'timeline_buffers', None)
+        if buffers is None:
+            buffers = connection.timeline_buffers = weakref.WeakValueDictionary()
+        key = tuple(connection.savepoint_ids)
+        buffer = buffers.get(key)
+        if buffer is None or buffer.flushed:
+            buffer = buffers[key] = TimelineEventBuffer(self)
+            transaction.on_commit(buffer, using=self.db)
+        return buffer
+
+
+class NotificationCounterManager(models.Manager):
+    """
+    Unread notification counts per user. A user's row is created the first
+    time their count is read, from one COUNT on the notification index;
+    after that writers adjust it in place, grouped so one UPDATE covers
+    every user whose count changes by the same amount.
+    """
+
+    def unread(self, user_id):
+        counter = self.filter(user_id=user_id).values_list('unread', flat=True).first()
+        if counter is None:
+            counter, _ = self.get_or_create(user_id=user_id, defaults={'unread': self.model.count_unread(user_id)})
+            counter = counter.unread
+        return counter
+
+    def add(self, counts):
+        by_amount = {}
+        for user_id, amount in counts.items():
+            by_amount.setdefault(amount, []).append(user_id)
+        for amount, user_ids in by_amount.items():
+            self.filter(user_id__in=user_ids).update(unread=Greatest(F('unread') + amount, 0))
+
+
+class ProjectStatsManager(models.Manager):
+    """
+    Per-project dashboard counters. Write hooks adjust a project's row in
+    place inside their transaction; a project without a row yet is
+    recounted from the source tables instead, and so is everything when
+    reconciling.
+    """
+
+    def adjust(self, changes):
+        """Apply (project id, counter field or None, delta) changes and stamp last_activity."""
+        deltas = {}
+        for project_id, field, delta in changes:
+            fields = deltas.setdefault(project_id, {})
+            if field:
+                fields[field] = fields.get(field, 0) + delta
+        now = timezone.now()
+        missing = [
+            project_id for project_id, fields in deltas.items()
+            if not self.filter(project_id=project_id).update(
+                last_activity=now, **{field: F(field) + delta for field, delta in fields.items() if delta}
+            )
+        ]
+        if missing:
+            self.recount(missing)
+
+    def recount(self, project_ids=None):
+        """Recompute and upsert the rows of `project_ids` (every project if None)."""
+        rows = self.model.tally(project_ids)
+        fields = [field.name for field in self.model._meta.concrete_fields if not field.primary_key]
+        return self.bulk_create(rows, update_conflicts=True, unique_fields=['project'], update_fields=fields)
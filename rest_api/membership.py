@@ -0,0 +1,53 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+
+from .models import Project
+
+CACHE_TIMEOUT = 60 * 10
+# invalidate() only reaches the worker it runs in when the cache is
+# process-local, so there entries expire before a removed member's other
+# workers would serve them for long.
+LOCAL_CACHE_TIMEOUT = 5
+
+
+def get_cache():
+    return caches[settings.MEMBERSHIP_CACHE]
+
+
+def cache_timeout(cache):
+    return LOCAL_CACHE_TIMEOUT if isinstance(cache, LocMemCache) else CACHE_TIMEOUT
+
+
+def cache_key(user_id):
+    return f"project_ids:{user_id}"
+
+
+def project_ids_for(user):
+    """Ids of the projects ``user`` is a team member of, cached per user."""
+    cache = get_cache()
+    key = cache_key(user.pk)
+    project_ids = cache.get(key)
+    if project_ids is None:
+        project_ids = frozenset(
+            Project.team_members.through.objects.filter(customuser_id=user.pk)
+            .values_list("project_id", flat=True)
+        )
+        cache.set(key, project_ids, cache_timeout(cache))
+    return project_ids
+
+
+def is_member(user, project_id):
+    try:
+        return int(project_id) in project_ids_for(user)
+    except (TypeError, ValueError):
+        return False
+
+
+def invalidate(user_ids):
+    keys = [cache_key(user_id) for user_id in user_ids]
+    if keys:
+        get_cache().delete_many(keys)
+        # Another request may refill the cache from the old rows before we commit.
+        transaction.on_commit(lambda: get_cache().delete_many(keys))
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rest_api', '0003_notification'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='timelineevent',
+            index=models.Index(fields=['project', 'timestamp', 'id'], name='timeline_project_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timelineevent',
+            index=models.Index(fields=['timestamp', 'id'], name='timeline_ts_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rest_api', '0005_timelineevent_user_nullable'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='timelineevent',
+            name='payload',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AlterField(
+            model_name='timelineevent',
+            name='description',
+            field=models.TextField(blank=True, default=''),
+        ),
+    ]
@@ -0,0 +1,18 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rest_api', '0006_timelineevent_payload'),
+    ]
+
+    # The auto-created team_members table only indexes each column on its
+    # own; "projects of user X" wants (customuser_id, project_id) so the
+    # lookup is answered from the index alone.
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX "project_member_user_idx" ON "rest_api_project_team_members" ("customuser_id", "project_id");',
+            'DROP INDEX "project_member_user_idx";',
+        ),
+    ]
@@ -0,0 +1,67 @@
+from django.db import migrations
+
+# One FTS5 row per task, document and comment. rowid = id * 4 + kind keeps
+# the three id spaces apart, so triggers can address a row without a
+# lookup. Triggers keep it current for every write path, including the
+# bulk_create/bulk_update ones that skip save().
+SOURCES = [
+    # (table, kind, code, title column, body column)
+    ('rest_api_task', 'task', 1, 'title', 'description'),
+    ('rest_api_document', 'document', 2, 'name', 'description'),
+    ('rest_api_comment', 'comment', 3, "''", 'text'),
+]
+
+
+INSERT = "INSERT INTO rest_api_search (rowid, title, body, kind, object_id, project_id)"
+
+
+def values(ref, kind, code, title, body):
+    title = title if title.startswith("'") else f'{ref}.{title}'
+    return f"{ref}.id * 4 + {code}, {title}, {ref}.{body}, '{kind}', {ref}.id, {ref}.project_id"
+
+
+def forwards(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE rest_api_search USING fts5("
+        "title, body, kind UNINDEXED, object_id UNINDEXED, project_id UNINDEXED, "
+        "tokenize = 'porter unicode61')"
+    )
+    for table, kind, code, title, body in SOURCES:
+        delete = f"DELETE FROM rest_api_search WHERE rowid = old.id * 4 + {code};"
+        insert = f"{INSERT} VALUES ({values('new', kind, code, title, body)});"
+        schema_editor.execute(
+            f"CREATE TRIGGER {table}_search_ai AFTER INSERT ON {table} BEGIN "
+            f"{insert} END"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER {table}_search_au AFTER UPDATE ON {table} BEGIN "
+            f"{delete} {insert} END"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER {table}_search_ad AFTER DELETE ON {table} BEGIN {delete} END"
+        )
+        schema_editor.execute(
+            f"{INSERT} SELECT {values('t', kind, code, title, body)} FROM {table} t"
+        )
+
+
+def backwards(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for table, *_ in SOURCES:
+        for suffix in ('ai', 'au', 'ad'):
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {table}_search_{suffix}")
+    schema_editor.execute("DROP TABLE IF EXISTS rest_api_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rest_api', '0012_notification_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
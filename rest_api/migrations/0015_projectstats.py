@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rest_api', '0014_task_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectStats',
+            fields=[
+                ('project', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='rest_api.project')),
+                ('tasks_open', models.IntegerField(default=0)),
+                ('tasks_review', models.IntegerField(default=0)),
+                ('tasks_working', models.IntegerField(default=0)),
+                ('tasks_awaiting', models.IntegerField(default=0)),
+                ('tasks_release', models.IntegerField(default=0)),
+                ('tasks_waiting_qa', models.IntegerField(default=0)),
+                ('documents', models.IntegerField(default=0)),
+                ('comments', models.IntegerField(default=0)),
+                ('last_activity', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rest_api', '0015_projectstats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupCursor',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('last_event_id', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ProjectActivityDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('events', models.JSONField(default=dict)),
+                ('tasks_opened', models.IntegerField(default=0)),
+                ('tasks_closed', models.IntegerField(default=0)),
+                ('tasks_removed', models.IntegerField(default=0)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activity_days', to='rest_api.project')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('project', 'day'), name='activity_project_day_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+# Task, document and comment events recorded before 0006 have no project_id,
+# so project feeds and rollups missed them. Take it from the row they are
+# about; events whose row is gone keep NULL.
+SOURCES = [('task', 'Task'), ('document', 'Document'), ('comment', 'Comment')]
+
+
+def forwards(apps, schema_editor):
+    TimelineEvent = apps.get_model('rest_api', 'TimelineEvent')
+    for field, model_name in SOURCES:
+        model = apps.get_model('rest_api', model_name)
+        TimelineEvent.objects.filter(project__isnull=True, **{f'{field}__isnull': False}).update(
+            project_id=Subquery(model.objects.filter(pk=OuterRef(f'{field}_id')).values('project_id')[:1])
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rest_api', '0017_task_moved_event'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def seed(apps, schema_editor):
+    """State of each task as of the rollup cursor, from its latest event up to it."""
+    RollupCursor = apps.get_model('rest_api', 'RollupCursor')
+    RollupTaskState = apps.get_model('rest_api', 'RollupTaskState')
+    TimelineEvent = apps.get_model('rest_api', 'TimelineEvent')
+    after = RollupCursor.objects.filter(name='daily').values_list('last_event_id', flat=True).first()
+    if not after:
+        return
+    latest = (
+        TimelineEvent.objects.filter(task__isnull=False, id__lte=after, event_type__in=('task_created', 'task_updated'))
+        .values('task_id').annotate(last=Max('id')).values('last')
+    )
+    rows = TimelineEvent.objects.filter(id__in=latest, project__isnull=False).values_list('task_id', 'project_id', 'payload')
+    RollupTaskState.objects.bulk_create(
+        [RollupTaskState(task_id=task_id, project_id=project_id, status=payload.get('status')) for task_id, project_id, payload in rows],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rest_api', '0018_backfill_event_projects'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupTaskState',
+            fields=[
+                ('task_id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('status', models.CharField(max_length=2, null=True)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='rest_api.project')),
+            ],
+        ),
+        migrations.RunPython(seed, migrations.RunPython.noop),
+    ]
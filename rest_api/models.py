@@ -1,9 +1,13 @@
+import uuid
+
 from django.contrib.auth.models import AbstractUser
 from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models import Count, Max
 from django.utils import timezone
 
-from .managers import UserManager
+from . import cache, thumbnails
+from .managers import NotificationCounterManager, ProjectStatsManager, TaskQuerySet, TimelineEventManager, UserManager
 
 
 class CustomUser(AbstractUser):
@@ -47,6 +51,18 @@ class Profile(models.Model):
         CustomUser, related_name="user_profile", on_delete=models.CASCADE
     )
 
+    def save(self, *args, **kwargs):
+        uploaded = self.profile_picture and not self.profile_picture._committed
+        replaced = None
+        if self.pk and (uploaded or not self.profile_picture):
+            replaced = Profile.objects.filter(pk=self.pk).values_list('profile_picture', flat=True).first()
+        super().save(*args, **kwargs)
+        if replaced:
+            # Even the same name: the new upload took a reference of its own.
+            self.profile_picture.storage.delete(replaced)
+        if uploaded:
+            thumbnails.schedule(self.profile_picture.name)
+
 
 def check_end_date(date):
     today = timezone.now().date()
@@ -73,32 +89,50 @@ class Project(models.Model):
         self.check_date
         is_new = self.pk is None
         super().save(*args, **kwargs)
-        if is_new:
-            TimelineEvent.objects.create(
-                event_type='project_created',
-                description=f'Project "{self.title}" created.',
-                project=self,
-                user=self.team_members.first()  # Example: assigning first team member as the user
-            )
-        else:
-            TimelineEvent.objects.create(
-                event_type='project_updated',
-                description=f'Project "{self.title}" updated.',
-                project=self,
-                user=self.team_members.first()  # Example: assigning first team member as the user
-            )
+        if not is_new:
+            cache.invalidate(Project, self.pk)
+        TimelineEvent.objects.record_many([
+            self.timeline_event('project_created' if is_new else 'project_updated')
+        ])
+
+    def timeline_event(self, event_type):
+        # No user: the hooks do not know who is acting, and looking one up
+        # would cost a query per save.
+        return TimelineEvent(event_type=event_type, project_id=self.pk)
 
     def delete(self, *args, **kwargs):
-        TimelineEvent.objects.create(
+        TimelineEvent.objects.record(
             event_type='project_deleted',
-            description=f'Project "{self.title}" deleted.',
-            project=self,
-            user=self.team_members.first()  # Example: assigning first team member as the user
+            payload={'title': self.title},
         )
+        cache.invalidate(Project, self.pk)
         super().delete(*args, **kwargs)
 
 
-class Task(models.Model):
+class LoadedValuesMixin:
+    """
+    Remembers `tracked_fields` as loaded from the database, so save() can
+    move a project's counters from the old values to the new ones.
+    """
+    tracked_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_loaded()
+        return instance
+
+    def remember_loaded(self):
+        self._loaded = {name: self.__dict__[name] for name in self.tracked_fields if name in self.__dict__}
+
+    def loaded_values(self):
+        loaded = getattr(self, '_loaded', {})
+        if len(loaded) < len(self.tracked_fields):
+            loaded = type(self).objects.filter(pk=self.pk).values(*self.tracked_fields).first() or {}
+        return loaded
+
+
+class Task(LoadedValuesMixin, models.Model):
     TASK_STATUS_CHOICES = [
         ("o", "OPEN"),
         ("r", "REVIEW"),
@@ -117,38 +151,75 @@ class Task(models.Model):
         CustomUser, related_name="assigned_user", on_delete=models.CASCADE
     )
 
+    objects = TaskQuerySet.as_manager()
+    tracked_fields = ('project_id', 'status')
+
+    class Meta:
+        # "My tasks" needs no index of its own: assignee is one-to-one, so
+        # its unique index already finds the (single) row.
+        indexes = [
+            models.Index(fields=['project', 'status', 'id'], name='task_project_status_idx'),
+            models.Index(fields=['project', 'title', 'id'], name='task_project_title_idx'),
+        ]
+
     def save(self, *args, **kwargs):
         is_new = self.pk is None
+        loaded = None if is_new else self.loaded_values()
         super().save(*args, **kwargs)
+        if not is_new:
+            cache.invalidate(Task, self.pk)
+        changes = [(self.project_id, ProjectStats.task_field(self.status), 1)]
+        if loaded:
+            changes.append((loaded['project_id'], ProjectStats.task_field(loaded['status']), -1))
+        ProjectStats.objects.adjust(changes)
+        self.remember_loaded()
         if is_new:
-            TimelineEvent.objects.create(
-                event_type='task_created',
-                description=f'Task "{self.title}" created for project "{self.project.title}".',
-                task=self,
-                user=self.assignee
-            )
+            TimelineEvent.objects.record_many([self.timeline_event('task_created')])
         else:
-            TimelineEvent.objects.create(
-                event_type='task_updated',
-                description=f'Task "{self.title}" updated for project "{self.project.title}".',
-                task=self,
-                user=self.assignee
-            )
+            TimelineEvent.objects.record_many(self.update_events(loaded))
+
+    def update_events(self, loaded):
+        """
+        The task_updated event, after a task_moved one for the project the
+        task left (by `loaded`), whose listings change too. The latter has
+        no task: it stays when the task is deleted and is not part of the
+        task's history.
+        """
+        events = [self.timeline_event('task_updated')]
+        if loaded and loaded['project_id'] != self.project_id:
+            events.insert(0, TimelineEvent(
+                event_type='task_moved',
+                project_id=loaded['project_id'],
+                user_id=self.assignee_id,
+                payload={'title': self.title, 'to': self.project_id},
+            ))
+        return events
+
+    def timeline_event(self, event_type):
+        return TimelineEvent(
+            event_type=event_type,
+            project_id=self.project_id,
+            task_id=self.pk,
+            user_id=self.assignee_id,
+            payload={'status': self.status},
+        )
 
     def delete(self, *args, **kwargs):
-        TimelineEvent.objects.create(
+        TimelineEvent.objects.record(
             event_type='task_deleted',
-            description=f'Task "{self.title}" deleted from project "{self.project.title}".',
-            task=self,
-            user=self.assignee
+            project_id=self.project_id,
+            user_id=self.assignee_id,
+            # The event outlives the task row, so its id goes in the payload.
+            payload={'title': self.title, 'status': self.status, 'task': self.pk},
         )
+        cache.invalidate(Task, self.pk)
         super().delete(*args, **kwargs)
 
     def __str__(self) -> str:
         return self.title
 
 
-class Document(models.Model):
+class Document(LoadedValuesMixin, models.Model):
     name = models.CharField(max_length=10)
     description = models.TextField()
     file = models.FileField(verbose_name="file", null=True, blank=True)
@@ -157,32 +228,48 @@ class Document(models.Model):
         Project, related_name="document_project", on_delete=models.CASCADE
     )
 
+    tracked_fields = ('project_id', 'file')
+
+    def remember_loaded(self):
+        super().remember_loaded()
+        # Keep the stored name, not the FieldFile a new upload replaces.
+        if 'file' in self._loaded:
+            self._loaded['file'] = getattr(self._loaded['file'], 'name', self._loaded['file'])
+
     def save(self, *args, **kwargs):
         is_new = self.pk is None
+        loaded = None if is_new else self.loaded_values()
+        replaced = None
+        if not is_new and (not self.file or not self.file._committed):
+            # A new upload (or none) replaces the stored file; release the
+            # old blob, even under the same name: the upload took a
+            # reference of its own.
+            replaced = loaded.get('file')
         super().save(*args, **kwargs)
-        if is_new:
-            TimelineEvent.objects.create(
-                event_type='document_uploaded',
-                description=f'Document "{self.name}" uploaded for project "{self.project.title}".',
-                document=self,
-                user=self.project.team_members.first()
-            )
-        else:
-            TimelineEvent.objects.create(
-                event_type='document_updated',
-                description=f'Document "{self.name}" updated for project "{self.project.title}".',
-                document=self,
-                user=self.project.team_members.first()
-            )
+        if replaced:
+            self.file.storage.delete(replaced)
+        if not is_new:
+            cache.invalidate(Document, self.pk)
+        changes = [(self.project_id, 'documents', 1)]
+        if loaded:
+            changes.append((loaded['project_id'], 'documents', -1))
+        ProjectStats.objects.adjust(changes)
+        self.remember_loaded()
+        TimelineEvent.objects.record(
+            event_type='document_uploaded' if is_new else 'document_updated',
+            project_id=self.project_id,
+            document_id=self.pk,
+        )
 
     def delete(self, *args, **kwargs):
-        TimelineEvent.objects.create(
+        TimelineEvent.objects.record(
             event_type='document_deleted',
-            description=f'Document "{self.name}" deleted from project "{self.project.title}".',
-            document=self,
-            user=self.project.team_members.first()
+            project_id=self.project_id,
+            payload={'title': self.name},
         )
+        cache.invalidate(Document, self.pk)
         super().delete(*args, **kwargs)
+        ProjectStats.objects.adjust([(self.project_id, 'documents', -1)])
 
     def __str__(self) -> str:
         return self.name
@@ -204,34 +291,131 @@ class Comment(models.Model):
     def save(self, *args, **kwargs):
         is_new = self.pk is None
         super().save(*args, **kwargs)
-        if is_new:
-            TimelineEvent.objects.create(
-                event_type='comment_created',
-                description=f'Comment by {self.author} on task "{self.task.title}" in project "{self.project.title}": {self.text}',
-                comment=self,
-                user=self.author
-            )
-        else:
-            TimelineEvent.objects.create(
-                event_type='comment_updated',
-                description=f'Comment by {self.author} on task "{self.task.title}" in project "{self.project.title}" updated: {self.text}',
-                comment=self,
-                user=self.author
-            )
+        ProjectStats.objects.adjust([(self.project_id, 'comments' if is_new else None, 1)])
+        TimelineEvent.objects.record(
+            event_type='comment_added' if is_new else 'comment_updated',
+            project_id=self.project_id,
+            task_id=self.task_id,
+            comment_id=self.pk,
+            user_id=self.author_id,
+        )
 
     def delete(self, *args, **kwargs):
-        TimelineEvent.objects.create(
+        TimelineEvent.objects.record(
             event_type='comment_deleted',
-            description=f'Comment by {self.author} on task "{self.task.title}" in project "{self.project.title}" deleted.',
-            comment=self,
-            user=self.author
+            project_id=self.project_id,
+            task_id=self.task_id,
+            user_id=self.author_id,
+            payload={'text': self.text},
         )
         super().delete(*args, **kwargs)
+        ProjectStats.objects.adjust([(self.project_id, 'comments', -1)])
 
     def __str__(self) -> str:
         return str(self.author)
 
 
+class ProjectStats(models.Model):
+    """
+    Dashboard counters of one project, kept current by the task, document
+    and comment write hooks so reading them is a single-row lookup.
+    """
+    TASK_FIELDS = {
+        "o": "tasks_open",
+        "r": "tasks_review",
+        "w": "tasks_working",
+        "a": "tasks_awaiting",
+        "rl": "tasks_release",
+        "wq": "tasks_waiting_qa",
+    }
+
+    project = models.OneToOneField(Project, primary_key=True, related_name="stats", on_delete=models.CASCADE)
+    tasks_open = models.IntegerField(default=0)
+    tasks_review = models.IntegerField(default=0)
+    tasks_working = models.IntegerField(default=0)
+    tasks_awaiting = models.IntegerField(default=0)
+    tasks_release = models.IntegerField(default=0)
+    tasks_waiting_qa = models.IntegerField(default=0)
+    documents = models.IntegerField(default=0)
+    comments = models.IntegerField(default=0)
+    last_activity = models.DateTimeField(null=True, blank=True)
+
+    objects = ProjectStatsManager()
+
+    @classmethod
+    def task_field(cls, status):
+        return cls.TASK_FIELDS.get(status)
+
+    @classmethod
+    def tally(cls, project_ids=None):
+        """Unsaved rows counted from the source tables, one GROUP BY per table."""
+        def scoped(queryset, field="project_id"):
+            return queryset if project_ids is None else queryset.filter(**{f"{field}__in": project_ids})
+
+        stats = {pk: cls(project_id=pk) for pk in scoped(Project.objects, "pk").values_list("pk", flat=True)}
+        for project_id, status, count in scoped(Task.objects).values_list("project_id", "status").annotate(Count("id")).order_by():
+            if status in cls.TASK_FIELDS:
+                setattr(stats[project_id], cls.TASK_FIELDS[status], count)
+        for project_id, count in scoped(Document.objects).values_list("project_id").annotate(Count("id")).order_by():
+            stats[project_id].documents = count
+        for project_id, count in scoped(Comment.objects).values_list("project_id").annotate(Count("id")).order_by():
+            stats[project_id].comments = count
+        events = scoped(TimelineEvent.objects.filter(project_id__isnull=False))
+        for project_id, timestamp in events.values_list("project_id").annotate(Max("timestamp")).order_by():
+            stats[project_id].last_activity = timestamp
+        return list(stats.values())
+
+    def __str__(self) -> str:
+        return f"Stats of {self.project_id}"
+
+
+class ProjectActivityDay(models.Model):
+    """
+    One project's timeline for one day, rolled up by rollups.build(): event
+    counts by type and the tasks that entered the backlog (created or
+    reopened), were released, or left it unreleased (deleted or moved).
+    """
+    project = models.ForeignKey(Project, related_name="activity_days", on_delete=models.CASCADE)
+    day = models.DateField()
+    events = models.JSONField(default=dict)
+    tasks_opened = models.IntegerField(default=0)
+    tasks_closed = models.IntegerField(default=0)
+    tasks_removed = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # Also the index the burndown's date range reads.
+            models.UniqueConstraint(fields=["project", "day"], name="activity_project_day_uniq"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.project_id} on {self.day}"
+
+
+class RollupCursor(models.Model):
+    """The last timeline event id a rollup has processed."""
+    name = models.CharField(max_length=50, primary_key=True)
+    last_event_id = models.BigIntegerField(default=0)
+
+    def __str__(self) -> str:
+        return f"{self.name} at {self.last_event_id}"
+
+
+class RollupTaskState(models.Model):
+    """
+    The project and status rollups.build() last saw of a task. A task's
+    events go with it, so this is what its task_deleted event is weighed
+    against.
+    """
+    task_id = models.BigIntegerField(primary_key=True)
+    project = models.ForeignKey(Project, related_name='+', on_delete=models.CASCADE)
+    # None for tasks whose events predate payloads.
+    status = models.CharField(max_length=2, null=True)
+
+    def __str__(self) -> str:
+        return f"task {self.task_id}: {self.status} in {self.project_id}"
+
+
 class RateLimit(models.Model):
     user = models.OneToOneField(
         CustomUser, related_name="rate_user", on_delete=models.CASCADE
@@ -241,12 +425,55 @@ class RateLimit(models.Model):
 
     def __str__(self) -> str:
         return str(self.user)
-    
+
+
+class RevokedToken(models.Model):
+    jti = models.CharField(max_length=255, unique=True)
+    expires_at = models.DateTimeField(db_index=True)
+    revoked_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self) -> str:
+        return self.jti
+
+
+class StoredBlob(models.Model):
+    """One file kept by ContentAddressedStorage, shared by every upload with the same bytes."""
+    name = models.CharField(max_length=255, unique=True)
+    size = models.PositiveBigIntegerField()
+    refcount = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self) -> str:
+        return self.name
+
+
+class UploadSession(models.Model):
+    """A resumable document upload: chunks received so far and the Document to create."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(CustomUser, related_name='upload_sessions', on_delete=models.CASCADE)
+    document = models.JSONField()
+    filename = models.CharField(max_length=255)
+    total_size = models.PositiveBigIntegerField()
+    chunk_size = models.PositiveIntegerField()
+    next_chunk = models.PositiveIntegerField(default=0)
+    received = models.PositiveBigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    @property
+    def chunk_count(self):
+        return max(1, -(-self.total_size // self.chunk_size))
+
+    def __str__(self) -> str:
+        return self.filename
+
+
 class TimelineEvent(models.Model):
     EVENT_TYPES = [
         ('task_created', 'Task Created'),
         ('task_updated', 'Task Updated'),
         ('task_deleted', 'Task Deleted'),
+        ('task_moved', 'Task Moved'),
         ('document_uploaded', 'Document Uploaded'),
         ('document_updated', 'Document Updated'),
         ('document_deleted', 'Document Deleted'),
@@ -258,24 +485,99 @@ class TimelineEvent(models.Model):
         ('project_deleted', 'Project Deleted'),
     ]
 
+    # Rendered at read time from the related rows; deleted objects keep
+    # what is needed in ``payload``.
+    DESCRIPTIONS = {
+        'task_created': 'Task "{task}" created for project "{project}".',
+        'task_updated': 'Task "{task}" updated for project "{project}".',
+        'task_deleted': 'Task "{title}" deleted from project "{project}".',
+        'task_moved': 'Task "{title}" moved out of project "{project}".',
+        'document_uploaded': 'Document "{document}" uploaded for project "{project}".',
+        'document_updated': 'Document "{document}" updated for project "{project}".',
+        'document_deleted': 'Document "{title}" deleted from project "{project}".',
+        'comment_added': 'Comment by {user} on task "{task}" in project "{project}": {text}',
+        'comment_created': 'Comment by {user} on task "{task}" in project "{project}": {text}',
+        'comment_updated': 'Comment by {user} on task "{task}" in project "{project}" updated: {text}',
+        'comment_deleted': 'Comment by {user} on task "{task}" in project "{project}" deleted.',
+        'project_created': 'Project "{project}" created.',
+        'project_updated': 'Project "{project}" updated.',
+        'project_deleted': 'Project "{title}" deleted.',
+    }
+
     event_type = models.CharField(max_length=30, choices=EVENT_TYPES)
-    description = models.TextField()
+    # Legacy rows carry a pre-rendered description; new rows leave it empty.
+    description = models.TextField(blank=True, default='')
+    payload = models.JSONField(default=dict, blank=True)
     timestamp = models.DateTimeField(auto_now_add=True)
     project = models.ForeignKey(Project, related_name='timeline_events', on_delete=models.CASCADE, null=True, blank=True)
     task = models.ForeignKey(Task, related_name='timeline_events', on_delete=models.CASCADE, null=True, blank=True)
     document = models.ForeignKey(Document, related_name='timeline_events', on_delete=models.CASCADE, null=True, blank=True)
     comment = models.ForeignKey(Comment, related_name='timeline_events', on_delete=models.CASCADE, null=True, blank=True)
-    user = models.ForeignKey(CustomUser, related_name='timeline_events', on_delete=models.CASCADE)
+    user = models.ForeignKey(CustomUser, related_name='timeline_events', on_delete=models.CASCADE, null=True, blank=True)
+
+    objects = TimelineEventManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['project', 'timestamp', 'id'], name='timeline_project_ts_idx'),
+            models.Index(fields=['timestamp', 'id'], name='timeline_ts_idx'),
+        ]
 
     def __str__(self):
         return f"{self.event_type} - {self.timestamp}"
 
+    def describe(self):
+        if self.description:
+            return self.description
+        template = self.DESCRIPTIONS.get(self.event_type)
+        if template is None:
+            return self.get_event_type_display()
+        return template.format(
+            project=self.project.title if self.project_id else '',
+            task=self.task.title if self.task_id else '',
+            document=self.document.name if self.document_id else '',
+            text=self.comment.text if self.comment_id else self.payload.get('text', ''),
+            title=self.payload.get('title', ''),
+            user=self.user if self.user_id else '',
+        )
+
 
 class Notification(models.Model):
     user = models.ForeignKey(CustomUser, related_name='notifications', on_delete=models.CASCADE)
-    message = models.TextField()
+    # Fanned-out notifications point at their event and render its
+    # description when read; message is only set for ad hoc ones.
+    event = models.ForeignKey(
+        TimelineEvent, related_name='notifications', null=True, blank=True, on_delete=models.CASCADE
+    )
+    message = models.TextField(blank=True, default='')
     is_read = models.BooleanField(default=False)
     timestamp = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Newest-first pages of a user's notifications, all or unread only.
+            models.Index(fields=['user', 'timestamp', 'id'], name='notification_user_ts_idx'),
+            models.Index(fields=['user', 'is_read', 'timestamp', 'id'], name='notification_unread_idx'),
+        ]
+
+    def render(self):
+        return self.message or (self.event.describe() if self.event_id else '')
+
+    def __str__(self):
+        return f"Notification for {self.user.email} - Read: {self.is_read}"
+
+class NotificationCounter(models.Model):
+    """Denormalized unread notification count, so reading it is one primary key lookup."""
+    user = models.OneToOneField(
+        CustomUser, primary_key=True, related_name='notification_counter', on_delete=models.CASCADE
+    )
+    unread = models.PositiveIntegerField(default=0)
+
+    objects = NotificationCounterManager()
+
+    @staticmethod
+    def count_unread(user_id):
+        return Notification.objects.filter(user_id=user_id, is_read=False).count()
+
     def __str__(self):
-        return f"Notification for {self.user.email} - Read: {self.is_read}"
\ No newline at end of file
+        return f"{self.user_id}: {self.unread} unread"
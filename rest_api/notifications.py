@@ -0,0 +1,94 @@
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import connections, transaction
+
+from . import executors
+from .models import Notification, NotificationCounter, Project, TimelineEvent
+from .pubsub import hub, user_channel
+
+
+def get_executor():
+    return executors.get("fanout", settings.NOTIFICATION_FANOUT_WORKERS)
+
+
+def fan_out(events):
+    """
+    Notify every team member of each event's project: one query for the
+    members of all the projects involved and one bulk_create for the
+    notifications, whatever the number of events or members.
+    """
+    events = [event for event in events if event.project_id]
+    if not events:
+        return
+    members = defaultdict(list)
+    memberships = Project.team_members.through.objects.filter(
+        project_id__in={event.project_id for event in events}
+    ).values_list('project_id', 'customuser_id')
+    for project_id, user_id in memberships:
+        members[project_id].append(user_id)
+    notifications = [
+        Notification(user_id=user_id, event_id=event.pk)
+        for event in events
+        for user_id in members[event.project_id]
+    ]
+    with transaction.atomic():
+        Notification.objects.bulk_create(notifications, batch_size=settings.NOTIFICATION_BATCH_SIZE)
+        NotificationCounter.objects.add(Counter(n.user_id for n in notifications))
+        transaction.on_commit(lambda: publish(notifications, events))
+
+
+def message(notification, text):
+    return {'type': 'notification', 'id': notification.pk, 'event': notification.event_id, 'message': text}
+
+
+def publish(notifications, events):
+    """Push new notifications to their users' open streams."""
+    if not notifications:
+        return
+    # The events only carry foreign key ids: load what describe() reads in
+    # one query rather than one per relation per event.
+    related = TimelineEvent.objects.filter(pk__in=[event.pk for event in events]).select_related(
+        'project', 'task', 'document', 'comment', 'user'
+    )
+    texts = {event.pk: event.describe() for event in related}
+    for notification in notifications:
+        if notification.event_id in texts:
+            hub.publish(user_channel(notification.user_id), message(notification, texts[notification.event_id]))
+
+
+def since(user_id, after, limit=100):
+    """Messages for the user's notifications newer than id `after`, oldest first."""
+    notifications = (
+        Notification.objects.filter(user_id=user_id, id__gt=after)
+        .select_related('event__project', 'event__task', 'event__document', 'event__comment', 'event__user')
+        .order_by('id')[:limit]
+    )
+    return [message(notification, notification.render()) for notification in notifications]
+
+
+def mark_read(user_id, ids=None):
+    """Mark the user's unread notifications (or those of `ids`) read with one UPDATE."""
+    unread = Notification.objects.filter(user_id=user_id, is_read=False)
+    if ids is not None:
+        unread = unread.filter(id__in=ids)
+    updated = unread.update(is_read=True)
+    if ids is None:
+        NotificationCounter.objects.filter(user_id=user_id).update(unread=0)
+    elif updated:
+        NotificationCounter.objects.add({user_id: -updated})
+    return updated
+
+
+def fan_out_in_thread(events):
+    try:
+        fan_out(events)
+    finally:
+        connections.close_all()
+
+
+def schedule(events):
+    if settings.NOTIFICATION_FANOUT_WORKERS:
+        get_executor().submit(fan_out_in_thread, events)
+    else:
+        fan_out(events)
@@ -0,0 +1,125 @@
+import base64
+import heapq
+from collections import namedtuple
+from datetime import datetime
+from itertools import islice
+from urllib import parse
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, CursorPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+Position = namedtuple('Position', ['timestamp', 'id', 'reverse'])
+
+
+class TimelineCursorPagination(BasePagination):
+    """
+    Newest first, seeking on (timestamp, id). DRF's CursorPagination only
+    seeks on the first ordering field and OFFSETs past the rows that share
+    it; here a cursor is the full (timestamp, id) of the row it points at,
+    so every page is a range scan on the composite timeline indexes, however
+    many events share a timestamp.
+
+    A view listing several partitions (say, every project a user is in) sets
+    `partition = (field, values)`: each value gets its own indexed query and
+    the pages are merged, where an IN filter would sort all matching rows.
+    """
+    cursor_query_param = 'cursor'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        position = self.decode_cursor(request)
+        partition = getattr(view, 'partition', None)
+        if partition is None:
+            rows = self.fetch(queryset, position)
+        else:
+            field, values = partition
+            parts = [self.fetch(queryset.filter(**{field: value}), position) for value in values]
+            reverse = position is None or not position.reverse
+            rows = list(islice(heapq.merge(*parts, key=lambda row: (row.timestamp, row.pk), reverse=reverse), self.page_size + 1))
+        self.page = rows[:self.page_size]
+        if position is not None and position.reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = True, len(rows) > self.page_size
+        else:
+            self.has_next, self.has_previous = len(rows) > self.page_size, position is not None
+        return self.page
+
+    def fetch(self, queryset, position):
+        """Up to page_size + 1 rows past `position`, in the order they are read."""
+        if position is None:
+            queryset = queryset.order_by('-timestamp', '-id')
+        elif position.reverse:
+            newer = Q(timestamp__gt=position.timestamp) | Q(timestamp=position.timestamp, id__gt=position.id)
+            queryset = queryset.filter(newer, timestamp__gte=position.timestamp).order_by('timestamp', 'id')
+        else:
+            older = Q(timestamp__lt=position.timestamp) | Q(timestamp=position.timestamp, id__lt=position.id)
+            queryset = queryset.filter(older, timestamp__lte=position.timestamp).order_by('-timestamp', '-id')
+        return list(queryset[:self.page_size + 1])
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(size, self.max_page_size) if size > 0 else self.page_size
+
+    def get_next_link(self):
+        if not (self.has_next and self.page):
+            return None
+        return self.encode_cursor(Position(self.page[-1].timestamp, self.page[-1].pk, False))
+
+    def get_previous_link(self):
+        if not (self.has_previous and self.page):
+            return None
+        return self.encode_cursor(Position(self.page[0].timestamp, self.page[0].pk, True))
+
+    def encode_cursor(self, position):
+        tokens = {'p': f'{position.timestamp.isoformat()}_{position.id}'}
+        if position.reverse:
+            tokens['r'] = '1'
+        encoded = base64.b64encode(parse.urlencode(tokens).encode('ascii')).decode('ascii')
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            tokens = parse.parse_qs(base64.b64decode(encoded.encode('ascii')).decode('ascii'))
+            timestamp, pk = tokens['p'][0].rsplit('_', 1)
+            return Position(datetime.fromisoformat(timestamp), int(pk), 'r' in tokens)
+        except (KeyError, ValueError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+
+class NotificationCursorPagination(TimelineCursorPagination):
+    # Same seek pagination, served by the (user, [is_read,] timestamp, id)
+    # notification indexes.
+    pass
+
+
+class TaskCursorPagination(CursorPagination):
+    # Ordered by id by default; title prefix searches order by (title, id)
+    # so the range and the ordering come from the same index.
+    ordering = ('id',)
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+    def get_ordering(self, request, queryset, view):
+        return getattr(view, 'ordering', self.ordering)
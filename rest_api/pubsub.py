@@ -0,0 +1,187 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.module_loading import import_string
+
+
+class Subscription:
+    """Messages for a set of channels, queued on the subscriber's event loop."""
+
+    def __init__(self, hub, channels, max_queued=100):
+        self.hub = hub
+        self.channels = set(channels)
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=max_queued)
+
+    def deliver(self, message):
+        # Called from whichever thread published; hand over to our loop.
+        self.loop.call_soon_threadsafe(self._put, message)
+
+    def _put(self, message):
+        if self.queue.full():
+            # A client this far behind recovers from the database.
+            self.queue.get_nowait()
+        self.queue.put_nowait(message)
+
+    async def get(self, timeout):
+        """The next message, or None if none arrives within `timeout` seconds."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def drain(self):
+        messages = []
+        while not self.queue.empty():
+            messages.append(self.queue.get_nowait())
+        return messages
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class Hub:
+    """
+    In-process pub/sub. Subscribers are async views waiting on their own
+    queue, so an idle client holds no thread and runs no queries. publish()
+    goes through the configured broker, which delivers back to the hub of
+    every process (or only this one, for LocalBroker).
+    """
+
+    def __init__(self):
+        self._channels = {}
+        self._lock = threading.Lock()
+        self._broker = None
+
+    @property
+    def broker(self):
+        if self._broker is None:
+            with self._lock:
+                if self._broker is None:
+                    config = getattr(settings, "PUBSUB", {})
+                    backend = import_string(config.get("BACKEND", "rest_api.pubsub.LocalBroker"))
+                    self._broker = backend(self, **config.get("OPTIONS", {}))
+        return self._broker
+
+    def subscribe(self, channels):
+        subscription = Subscription(self, channels)
+        with self._lock:
+            for channel in subscription.channels:
+                self._channels.setdefault(channel, set()).add(subscription)
+        self.broker.listen()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._channels.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._channels[channel]
+
+    def publish(self, channel, message):
+        self.broker.publish(channel, message)
+
+    def deliver(self, channel, message):
+        with self._lock:
+            subscribers = list(self._channels.get(channel, ()))
+        for subscription in subscribers:
+            subscription.deliver(message)
+
+
+class LocalBroker:
+    """Deliver within this process only: enough for a single ASGI worker."""
+
+    def __init__(self, hub):
+        self.hub = hub
+
+    def listen(self):
+        pass
+
+    def publish(self, channel, message):
+        self.hub.deliver(channel, message)
+
+
+class SQLiteBroker:
+    """
+    Share messages between worker processes on one host through a small
+    SQLite file. Publishers append a row; each process that has subscribers
+    runs one thread polling for new rows every `interval` seconds, however
+    many clients it serves. Rows older than `retention` seconds are pruned.
+    """
+
+    def __init__(self, hub, path=None, interval=0.25, retention=60):
+        self.hub = hub
+        self.path = str(path or os.path.join(settings.BASE_DIR, "pubsub.sqlite3"))
+        self.interval = interval
+        self.retention = retention
+        self._local = threading.local()
+        self._thread = None
+        self._lock = threading.Lock()
+        with self.connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS message ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, channel TEXT NOT NULL, "
+                "payload TEXT NOT NULL, created REAL NOT NULL)"
+            )
+
+    def connect(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = self._local.db = sqlite3.connect(self.path, timeout=5)
+        return db
+
+    def publish(self, channel, message):
+        with self.connect() as db:
+            db.execute(
+                "INSERT INTO message (channel, payload, created) VALUES (?, ?, ?)",
+                (channel, json.dumps(message, cls=DjangoJSONEncoder), time.time()),
+            )
+
+    def listen(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self.poll, name="pubsub", daemon=True)
+                    self._thread.start()
+
+    def poll(self):
+        db = self.connect()
+        last_id = db.execute("SELECT COALESCE(MAX(id), 0) FROM message").fetchone()[0]
+        last_prune = time.monotonic()
+        while True:
+            time.sleep(self.interval)
+            rows = db.execute(
+                "SELECT id, channel, payload FROM message WHERE id > ? ORDER BY id", (last_id,)
+            ).fetchall()
+            for last_id, channel, payload in rows:
+                self.hub.deliver(channel, json.loads(payload))
+            if time.monotonic() - last_prune > self.retention:
+                with db:
+                    db.execute("DELETE FROM message WHERE created < ?", (time.time() - self.retention,))
+                last_prune = time.monotonic()
+
+
+hub = Hub()
+
+
+def user_channel(user_id):
+    return f"user:{user_id}"
+
+
+def project_channel(project_id):
+    return f"project:{project_id}"
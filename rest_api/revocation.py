@@ -0,0 +1,109 @@
+import hashlib
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import RevokedToken
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate=0.001):
+        self.capacity = max(capacity, 1024)
+        self.size = math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class RevocationList:
+    """
+    In-memory view of RevokedToken: a Bloom filter in front of a
+    jti -> expiry map. It is built on first use, picks up rows revoked by
+    other workers every REVOCATION_SYNC_INTERVAL seconds and drops expired
+    tokens from memory every REVOCATION_PRUNE_INTERVAL seconds, so checking
+    a token never touches the database. Expired rows are deleted by the
+    prune_revoked_tokens command.
+
+    Readers take the (filter, map) pair without the lock; a rebuild builds
+    a new pair and swaps it in whole.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._state = (BloomFilter(0), {})
+        self._last_id = 0
+        self._last_sync = self._last_prune = 0.0
+
+    def is_revoked(self, jti):
+        self._refresh()
+        bloom, expiry = self._state
+        return jti in bloom and jti in expiry
+
+    def revoke(self, jti, expires_at):
+        RevokedToken.objects.get_or_create(jti=jti, defaults={"expires_at": expires_at})
+        with self._lock:
+            if self._loaded:
+                self._add(jti, expires_at)
+
+    def _refresh(self):
+        now = time.monotonic()
+        if self._loaded and now - self._last_sync < settings.REVOCATION_SYNC_INTERVAL:
+            return
+        with self._lock:
+            if not self._loaded:
+                self._load_all()
+                self._last_prune = now
+            elif now - self._last_sync >= settings.REVOCATION_SYNC_INTERVAL:
+                if now - self._last_prune >= settings.REVOCATION_PRUNE_INTERVAL:
+                    self._prune()
+                    self._last_prune = now
+                for _, jti, expires_at in self._rows(RevokedToken.objects.filter(id__gt=self._last_id)):
+                    self._add(jti, expires_at)
+            self._last_sync = now
+
+    def _rows(self, tokens):
+        for row in tokens.order_by("id").values_list("id", "jti", "expires_at").iterator():
+            self._last_id = row[0]
+            yield row
+
+    def _load_all(self):
+        tokens = RevokedToken.objects.filter(expires_at__gt=timezone.now())
+        self._replace({jti: expires_at for _, jti, expires_at in self._rows(tokens)})
+        self._loaded = True
+
+    def _prune(self):
+        now = timezone.now()
+        self._replace({jti: expires_at for jti, expires_at in self._state[1].items() if expires_at > now})
+
+    def _add(self, jti, expires_at):
+        bloom, expiry = self._state
+        if len(expiry) >= bloom.capacity:
+            self._replace({**expiry, jti: expires_at})
+            return
+        expiry[jti] = expires_at
+        bloom.add(jti)
+
+    def _replace(self, expiry):
+        bloom = BloomFilter(2 * len(expiry))
+        for jti in expiry:
+            bloom.add(jti)
+        self._state = (bloom, expiry)
+
+
+revocation_list = RevocationList()
@@ -0,0 +1,246 @@
+import math
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import Project, ProjectActivityDay, RollupCursor, RollupTaskState, TimelineEvent
+
+CURSOR = 'daily'
+RELEASED = 'rl'
+TASK_EVENTS = ('task_created', 'task_updated')
+EVENT_TYPES = [event_type for event_type, _ in TimelineEvent.EVENT_TYPES]
+FLOWS = ('tasks_opened', 'tasks_closed', 'tasks_removed')
+
+
+class CursorMoved(Exception):
+    """Another process rolled up the same events first."""
+
+
+def build(batch_size=None):
+    """
+    Fold the timeline events recorded since the last run into the daily
+    rollups, `batch_size` events per transaction. Returns how many events
+    were processed.
+
+    Events are read in id order, which is commit order on SQLite's single
+    writer. A task's earlier events disappear with it, so the project and
+    status each task was last counted with are kept in RollupTaskState: a
+    deleted task is only taken off the backlog it was counted in.
+    """
+    batch_size = batch_size or settings.ROLLUP_BATCH_SIZE
+    RollupCursor.objects.get_or_create(name=CURSOR)
+    processed = 0
+    while True:
+        try:
+            count = build_batch(batch_size)
+        except CursorMoved:
+            break
+        processed += count
+        if count < batch_size:
+            break
+    return processed
+
+
+def build_batch(batch_size):
+    after = RollupCursor.objects.filter(name=CURSOR).values_list('last_event_id', flat=True).get()
+    events = list(
+        TimelineEvent.objects.filter(id__gt=after, project_id__isnull=False)
+        .order_by('id')
+        .values_list('id', 'project_id', 'task_id', 'event_type', 'timestamp', 'payload')[:batch_size]
+    )
+    if not events:
+        return 0
+    seen = task_states(events)
+    states = dict(seen)
+    days = tally(events, states, after)
+    with transaction.atomic():
+        # Claim the batch first: the UPDATE only matches if nobody else has.
+        if not RollupCursor.objects.filter(name=CURSOR, last_event_id=after).update(last_event_id=events[-1][0]):
+            raise CursorMoved
+        merge(days)
+        save_states(states, seen)
+    return len(events)
+
+
+def event_task_id(task_id, event_type, payload):
+    return payload.get('task') if event_type == 'task_deleted' else task_id
+
+
+def task_states(events):
+    """(project id, status) the rollups last saw of each task in `events`."""
+    task_ids = {
+        event_task_id(task_id, event_type, payload)
+        for _, _, task_id, event_type, _, payload in events
+        if event_type in TASK_EVENTS or event_type == 'task_deleted'
+    }
+    task_ids.discard(None)
+    return {
+        task_id: (project_id, status)
+        for task_id, project_id, status in RollupTaskState.objects.filter(task_id__in=task_ids).values_list(
+            'task_id', 'project_id', 'status'
+        )
+    }
+
+
+def save_states(states, seen):
+    """Store the task states a batch changed; None marks a deleted task."""
+    RollupTaskState.objects.filter(task_id__in=[
+        task_id for task_id, state in states.items() if state is None and task_id in seen
+    ]).delete()
+    changed = {task_id: state for task_id, state in states.items() if state is not None and seen.get(task_id) != state}
+    live = set(Project.objects.filter(pk__in={project_id for project_id, _ in changed.values()}).values_list('pk', flat=True))
+    RollupTaskState.objects.bulk_create(
+        [RollupTaskState(task_id=task_id, project_id=project_id, status=status)
+         for task_id, (project_id, status) in changed.items() if project_id in live],
+        update_conflicts=True, unique_fields=['task_id'], update_fields=['project', 'status'],
+    )
+
+
+def counted_state(payload, after):
+    """
+    (project id, status) the rollups last saw of a task deleted before
+    RollupTaskState, from the states its task_deleted event may carry, or
+    None if they never saw it.
+    """
+    if 'states' not in payload:
+        # Recorded before deletions carried states.
+        return None, payload.get('status')
+    seen = [state for state in payload['states'] if state[0] <= after]
+    return tuple(seen[-1][1:]) if seen else None
+
+
+def tally(events, states, after=0):
+    """
+    Per (project id, day) event counts and task flows of a batch of events
+    following event id `after`.
+    """
+    days = defaultdict(lambda: {'events': Counter(), **{flow: 0 for flow in FLOWS}})
+    for _, project_id, task_id, event_type, timestamp, payload in events:
+        day = timezone.localdate(timestamp)
+        days[project_id, day]['events'][event_type] += 1
+        status = payload.get('status')
+        if event_type == 'task_deleted':
+            if 'task' in payload:
+                counted = states.get(payload['task'])
+                states[payload['task']] = None
+            else:
+                counted = counted_state(payload, after)
+            if counted is not None and counted[1] != RELEASED:
+                days[counted[0] or project_id, day]['tasks_removed'] += 1
+            continue
+        if event_type not in TASK_EVENTS:
+            continue
+        before = None if event_type == 'task_created' else states.get(task_id)
+        states[task_id] = (project_id, status)
+        if event_type == 'task_created':
+            days[project_id, day]['tasks_opened'] += 1
+            if status == RELEASED:
+                days[project_id, day]['tasks_closed'] += 1
+        elif before is None:
+            # No earlier state to compare with (legacy events).
+            continue
+        elif before[0] == project_id:
+            if before[1] != RELEASED and status == RELEASED:
+                days[project_id, day]['tasks_closed'] += 1
+            elif before[1] == RELEASED and status != RELEASED:
+                days[project_id, day]['tasks_opened'] += 1
+        else:
+            # Moved between projects: only an unreleased task moves backlog.
+            if before[1] != RELEASED:
+                days[before[0], day]['tasks_removed'] += 1
+            if status != RELEASED:
+                days[project_id, day]['tasks_opened'] += 1
+    return days
+
+
+def merge(days):
+    """Add `days` onto the stored rows with one read and one upsert."""
+    live = set(Project.objects.filter(pk__in={project_id for project_id, _ in days}).values_list('pk', flat=True))
+    days = {key: counts for key, counts in days.items() if key[0] in live}
+    if not days:
+        return
+    stored = ProjectActivityDay.objects.filter(
+        project_id__in={project_id for project_id, _ in days}, day__in={day for _, day in days}
+    )
+    for row in stored:
+        counts = days.get((row.project_id, row.day))
+        if counts is not None:
+            counts['events'].update(row.events)
+            for flow in FLOWS:
+                counts[flow] += getattr(row, flow)
+    rows = [
+        ProjectActivityDay(project_id=project_id, day=day, events=dict(counts.pop('events')), **counts)
+        for (project_id, day), counts in days.items()
+    ]
+    ProjectActivityDay.objects.bulk_create(
+        rows, update_conflicts=True, unique_fields=['project', 'day'], update_fields=['events', *FLOWS]
+    )
+
+
+def version():
+    return RollupCursor.objects.filter(name=CURSOR).values_list('last_event_id', flat=True).first() or 0
+
+
+def burndown(project_id, start, end, window=7):
+    """
+    Daily series of a project from `start` to `end` inclusive, computed with
+    array operations over the rolled-up rows: at most one row per day plus
+    one aggregate for everything before `start`.
+    """
+    n = (end - start).days + 1
+    rows = list(
+        ProjectActivityDay.objects.filter(project_id=project_id, day__range=(start, end))
+        .values_list('day', *FLOWS, 'events')
+    )
+    before = ProjectActivityDay.objects.filter(project_id=project_id, day__lt=start).aggregate(
+        **{flow: Sum(flow, default=0) for flow in FLOWS}
+    )
+
+    flows = np.zeros((len(FLOWS), n), dtype=np.int64)
+    events = np.zeros((len(EVENT_TYPES), n), dtype=np.int64)
+    if rows:
+        days, *counts, by_type = zip(*rows)
+        index = (np.array(days, dtype='datetime64[D]') - np.datetime64(start, 'D')).astype(np.int64)
+        flows[:, index] = np.array(counts, dtype=np.int64)
+        position = {event_type: i for i, event_type in enumerate(EVENT_TYPES)}
+        cells = [(position[event_type], day, count) for day, types in zip(index, by_type)
+                 for event_type, count in types.items() if event_type in position]
+        if cells:
+            type_index, day_index, values = np.array(cells, dtype=np.int64).T
+            np.add.at(events, (type_index, day_index), values)
+    opened, closed, removed = flows
+
+    scope = before['tasks_opened'] - before['tasks_removed'] + np.cumsum(opened - removed)
+    remaining = scope - before['tasks_closed'] - np.cumsum(closed)
+
+    # Trailing mean of tasks closed per day; the first days average what
+    # they have.
+    closed_sum = np.concatenate(([0], np.cumsum(closed)))
+    upper = np.arange(1, n + 1)
+    lower = np.maximum(upper - window, 0)
+    velocity = (closed_sum[upper] - closed_sum[lower]) / (upper - lower)
+
+    burn_rate = float(np.mean((closed + removed - opened)[-window:]))
+    forecast = None
+    if remaining[-1] > 0 and burn_rate > 0:
+        forecast = end + timedelta(days=math.ceil(remaining[-1] / burn_rate))
+
+    return {
+        'start': start,
+        'end': end,
+        'days': np.arange(np.datetime64(start, 'D'), np.datetime64(end, 'D') + 1).astype(str).tolist(),
+        'opened': opened.tolist(),
+        'closed': closed.tolist(),
+        'removed': removed.tolist(),
+        'scope': scope.tolist(),
+        'remaining': remaining.tolist(),
+        'velocity': np.round(velocity, 3).tolist(),
+        'events': {event_type: events[i].tolist() for i, event_type in enumerate(EVENT_TYPES) if events[i].any()},
+        'burn_rate': round(burn_rate, 3),
+        'forecast': forecast,
+    }
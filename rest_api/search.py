@@ -0,0 +1,108 @@
+import re
+
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+
+KINDS = ('task', 'document', 'comment')
+
+TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+# (table, rowid offset, kind, title column, body column) of each indexed
+# source; rowid = id * 4 + offset, as migration 0013 set up.
+SOURCES = [
+    ('rest_api_task', 1, 'task', 'title', 'description'),
+    ('rest_api_document', 2, 'document', 'name', 'description'),
+    ('rest_api_comment', 3, 'comment', None, 'text'),
+]
+
+
+def match_expression(query):
+    """
+    FTS5 query for free text: every word must match, the last one as a
+    prefix so results follow the user's typing. Words are quoted, so FTS5
+    operators in the input are searched for rather than interpreted.
+    """
+    terms = TERM_RE.findall(query)
+    if not terms:
+        return None
+    return ' '.join(f'"{term}"' for term in terms) + '*'
+
+
+def search(query, project_ids, kinds=KINDS, limit=20, offset=0):
+    """
+    Ranked matches within `project_ids`, best first by bm25 with titles
+    weighted above bodies. Each hit has its kind, id, project, title and a
+    snippet of the matching text with the terms in [brackets].
+    """
+    expression = match_expression(query)
+    if expression is None or not project_ids or not kinds:
+        return []
+    project_placeholders = ', '.join(['%s'] * len(project_ids))
+    kind_placeholders = ', '.join(['%s'] * len(kinds))
+    sql = (
+        "SELECT kind, object_id, project_id, title, "
+        "snippet(rest_api_search, 1, '[', ']', '...', 12), bm25(rest_api_search, 10.0, 1.0) AS rank "
+        "FROM rest_api_search "
+        f"WHERE rest_api_search MATCH %s AND project_id IN ({project_placeholders}) AND kind IN ({kind_placeholders}) "
+        "ORDER BY rank LIMIT %s OFFSET %s"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [expression, *project_ids, *kinds, limit, offset])
+        rows = cursor.fetchall()
+    return [
+        {'kind': kind, 'id': object_id, 'project': project_id, 'title': title, 'snippet': snippet, 'rank': rank}
+        for kind, object_id, project_id, title, snippet, rank in rows
+    ]
+
+
+def columns(ref, offset, kind, title, body):
+    title = f'{ref}.{title}' if title else "''"
+    return f"{ref}.id * 4 + {offset}, {title}, {ref}.{body}, '{kind}', {ref}.id, {ref}.project_id"
+
+
+def triggers():
+    """{name: CREATE TRIGGER statement} of the triggers keeping the index current."""
+    insert = "INSERT INTO rest_api_search (rowid, title, body, kind, object_id, project_id)"
+    statements = {}
+    for table, offset, *source in SOURCES:
+        delete = f"DELETE FROM rest_api_search WHERE rowid = old.id * 4 + {offset};"
+        add = f"{insert} VALUES ({columns('new', offset, *source)});"
+        statements[f'{table}_search_ai'] = f"AFTER INSERT ON {table} BEGIN {add} END"
+        statements[f'{table}_search_au'] = f"AFTER UPDATE ON {table} BEGIN {delete} {add} END"
+        statements[f'{table}_search_ad'] = f"AFTER DELETE ON {table} BEGIN {delete} END"
+    return {name: f"CREATE TRIGGER {name} {body}" for name, body in statements.items()}
+
+
+def ensure_triggers(using=DEFAULT_DB_ALIAS):
+    """
+    Recreate any index trigger that is missing, as after a migration that
+    remade a source table (SQLite drops a table's triggers with it), and
+    reindex since writes made without it were not indexed. Returns the
+    names of the triggers created.
+    """
+    db = connections[using]
+    if db.vendor != 'sqlite':
+        return []
+    with db.cursor() as cursor:
+        cursor.execute("SELECT type, name FROM sqlite_master WHERE type IN ('table', 'trigger')")
+        existing = {(kind, name) for kind, name in cursor.fetchall()}
+        if ('table', 'rest_api_search') not in existing:
+            return []
+        missing = [name for name in triggers() if ('trigger', name) not in existing]
+        for name in missing:
+            cursor.execute(triggers()[name])
+    if missing:
+        rebuild(using)
+    return missing
+
+
+def rebuild(using=DEFAULT_DB_ALIAS):
+    """Refill the index from the source tables and merge its segments."""
+    with connections[using].cursor() as cursor:
+        cursor.execute("DELETE FROM rest_api_search")
+        cursor.execute(
+            "INSERT INTO rest_api_search (rowid, title, body, kind, object_id, project_id) "
+            + " UNION ALL ".join(f"SELECT {columns(table, *source)} FROM {table}" for table, *source in SOURCES)
+        )
+        cursor.execute("INSERT INTO rest_api_search (rest_api_search) VALUES ('optimize')")
+        cursor.execute("SELECT count(*) FROM rest_api_search")
+        return cursor.fetchone()[0]
@@ -1,11 +1,75 @@
 from rest_framework import serializers
-from .models import CustomUser, Profile, Project, Task, Document, Comment, TimelineEvent, Notification
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.tokens import RefreshToken
+from .models import CustomUser, Profile, Project, ProjectStats, Task, Document, Comment, TimelineEvent, Notification
 from django.contrib.auth import authenticate
+from django.db import transaction
+from . import cache, membership
+from .authentication import ClaimsRefreshToken, check_not_revoked
+from .thumbnails import variant_urls
+
+class DynamicFieldsMixin:
+    """
+    ``fields=[...]`` trims the output to the named fields and
+    ``expand=[...]`` replaces the listed relations with the nested
+    serializers in ``expandable_fields``.
+    """
+    expandable_fields = {}
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        expand = kwargs.pop('expand', None) or ()
+        super().__init__(*args, **kwargs)
+        for name in expand:
+            if name in self.expandable_fields:
+                self.fields[name] = self.expandable_fields[name]()
+        if fields:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    @classmethod
+    def optimize_queryset(cls, queryset, fields=None, expand=()):
+        """Load only the columns and relations the output will read."""
+        opts = queryset.model._meta
+        names = [name for name in cls.Meta.fields if not fields or name in fields]
+        names += [name for name in expand if name in cls.expandable_fields and name not in names]
+        columns = []
+        for name in names:
+            source = cls.expandable_fields[name]().source if name in expand else None
+            field = opts.get_field(source or name)
+            if field.many_to_many or field.one_to_many:
+                queryset = queryset.prefetch_related(field.name if field.concrete else field.get_accessor_name())
+            else:
+                columns.append(field.name)
+                if field.is_relation and name in expand:
+                    queryset = queryset.select_related(field.name)
+        if fields:
+            queryset = queryset.only('id', *columns)
+        return queryset
+
+
+class MemberSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = CustomUser
+        fields = ['id', 'username', 'email']
+
 
 class ProfileSerializer(serializers.ModelSerializer):
+    thumbnails = serializers.SerializerMethodField()
+
     class Meta:
         model = Profile
-        fields = ["id", "profile_picture", "status", "contact_number"]
+        fields = ["id", "profile_picture", "thumbnails", "status", "contact_number"]
+
+    def get_thumbnails(self, profile):
+        if not profile.profile_picture:
+            return {}
+        urls = variant_urls(profile.profile_picture.name)
+        request = self.context.get('request')
+        if request is not None:
+            urls = {size: request.build_absolute_uri(url) for size, url in urls.items()}
+        return urls
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -24,7 +88,11 @@ class UserSerializer(serializers.ModelSerializer):
             email=validated_data['email'],
             username=validated_data['username']
         )
-        user.set_password(validated_data['password'])
+        if 'password_hash' in validated_data:
+            # Already hashed off the request thread by the async register view.
+            user.password = validated_data['password_hash']
+        else:
+            user.set_password(validated_data['password'])
         user.save()
         profile = validated_data.pop('user_profile')
         profile = Profile(
@@ -37,25 +105,208 @@ class UserSerializer(serializers.ModelSerializer):
         return user
 
 
-class ProjectSerializer(serializers.ModelSerializer):
+class BulkListSerializer(serializers.ListSerializer):
+    """
+    Validates a list of objects and writes them with bulk_create/bulk_update.
+
+    For updates ``instance`` is a list of model objects and every item in
+    the payload must carry the ``id`` of one of them.
+    """
+
+    def to_internal_value(self, data):
+        self._ids = set()
+        return super().to_internal_value(data)
+
+    def run_child_validation(self, data):
+        if self.instance is not None:
+            instances = {obj.pk: obj for obj in self.instance}
+            if not isinstance(data, dict) or data.get('id') not in instances:
+                raise serializers.ValidationError({'id': ['Unknown or missing id.']})
+            if data['id'] in self._ids:
+                raise serializers.ValidationError({'id': ['Duplicate id in batch.']})
+            self._ids.add(data['id'])
+            self.child.instance = instances[data['id']]
+            self.child.initial_data = data
+        return super().run_child_validation(data)
+
+    def update(self, instances, validated_data):
+        instances = {obj.pk: obj for obj in instances}
+        return [
+            (instances[item['id']], attrs)
+            for item, attrs in zip(self.initial_data, validated_data)
+        ]
+
+
+def creator_of(context):
+    """The requesting user, as a list of zero or one, to add to new projects."""
+    request = context.get('request')
+    return [request.user] if request is not None else []
+
+
+class ProjectBulkSerializer(BulkListSerializer):
+    def create(self, validated_data):
+        creator = creator_of(self.context)
+        members = [[*attrs.pop('team_members', []), *creator] for attrs in validated_data]
+        with transaction.atomic():
+            projects = Project.objects.bulk_create([Project(**attrs) for attrs in validated_data])
+            self._set_members(projects, members)
+            TimelineEvent.objects.record_many([
+                project.timeline_event('project_created') for project in projects
+            ])
+        return projects
+
+    def update(self, instances, validated_data):
+        pairs = super().update(instances, validated_data)
+        fields = set()
+        projects, members = [], []
+        for project, attrs in pairs:
+            members.append(attrs.pop('team_members', None))
+            for attr, value in attrs.items():
+                setattr(project, attr, value)
+            fields.update(attrs)
+            projects.append(project)
+        with transaction.atomic():
+            if fields:
+                Project.objects.bulk_update(projects, fields)
+            for project in projects:
+                cache.invalidate(Project, project.pk)
+            replaced = [(project, team) for project, team in zip(projects, members) if team is not None]
+            if replaced:
+                through = Project.team_members.through.objects.filter(
+                    project__in=[project for project, _ in replaced]
+                )
+                membership.invalidate(list(through.values_list('customuser_id', flat=True)))
+                through.delete()
+                self._set_members(*zip(*replaced))
+            TimelineEvent.objects.record_many([
+                project.timeline_event('project_updated') for project in projects
+            ])
+        return projects
+
+    def _set_members(self, projects, members):
+        # bulk_create bypasses m2m_changed, so the membership cache is
+        # invalidated here.
+        through = Project.team_members.through
+        rows = through.objects.bulk_create([
+            through(project_id=project.pk, customuser_id=user_id)
+            for project, team in zip(projects, members)
+            for user_id in dict.fromkeys(user.pk for user in team)
+        ])
+        membership.invalidate({row.customuser_id for row in rows})
+
+
+class ProjectSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    expandable_fields = {
+        'team_members': lambda: MemberSerializer(many=True, read_only=True),
+        'tasks': lambda: TaskSerializer(many=True, read_only=True, source='task_project'),
+    }
+
     class Meta:
         model = Project
         fields = ['id', 'title', 'description', 'start_date', 'end_date', 'team_members']
-    
+        # The creator is always added to the team.
+        extra_kwargs = {'team_members': {'required': False}}
+        list_serializer_class = ProjectBulkSerializer
+
+    def create(self, validated_data):
+        creator = [user.pk for user in creator_of(self.context)]
+        validated_data['team_members'] = [*validated_data.get('team_members', []), *creator]
+        return super().create(validated_data)
+
+    def validate(self, data):
+        start_date = data.get('start_date', getattr(self.instance, 'start_date', None))
+        end_date = data.get('end_date', getattr(self.instance, 'end_date', None))
+        if start_date and end_date and not start_date < end_date:
+            raise serializers.ValidationError('the end date must be greater than start date')
+        return data
+
+
+class TaskBulkSerializer(BulkListSerializer):
+    def to_internal_value(self, data):
+        # assignee is one-to-one, which the per-item UniqueValidator cannot
+        # check across the batch.
+        self._assignees = set()
+        return super().to_internal_value(data)
+
+    def run_child_validation(self, data):
+        validated = super().run_child_validation(data)
+        assignee = validated.get('assignee')
+        if assignee is not None:
+            if assignee.pk in self._assignees:
+                raise serializers.ValidationError({'assignee': ['Assigned to another task in this batch.']})
+            self._assignees.add(assignee.pk)
+        return validated
+
+    def create(self, validated_data):
+        with transaction.atomic():
+            tasks = Task.objects.bulk_create([Task(**attrs) for attrs in validated_data])
+            ProjectStats.objects.adjust([(task.project_id, ProjectStats.task_field(task.status), 1) for task in tasks])
+            TimelineEvent.objects.record_many([task.timeline_event('task_created') for task in tasks])
+        return tasks
+
+    def update(self, instances, validated_data):
+        pairs = super().update(instances, validated_data)
+        fields = set()
+        tasks, changes, events = [], [], []
+        for task, attrs in pairs:
+            loaded = task.loaded_values()
+            changes.append((loaded['project_id'], ProjectStats.task_field(loaded['status']), -1))
+            for attr, value in attrs.items():
+                setattr(task, attr, value)
+            fields.update(attrs)
+            tasks.append(task)
+            changes.append((task.project_id, ProjectStats.task_field(task.status), 1))
+            events.extend(task.update_events(loaded))
+        with transaction.atomic():
+            if fields:
+                Task.objects.bulk_update(tasks, fields)
+            ProjectStats.objects.adjust(changes)
+            for task in tasks:
+                task.remember_loaded()
+                cache.invalidate(Task, task.pk)
+            TimelineEvent.objects.record_many(events)
+        return tasks
+
+
+class ProjectSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Project
+        fields = ['id', 'title', 'start_date', 'end_date']
+
+
+class ProjectMemberMixin:
+    """Only lets the requesting user attach objects to their own projects."""
+
+    def validate_project(self, project):
+        request = self.context.get('request')
+        if request is not None and not membership.is_member(request.user, project.pk):
+            raise serializers.ValidationError('You are not a member of this project.')
+        return project
+
+
+class TaskSerializer(ProjectMemberMixin, DynamicFieldsMixin, serializers.ModelSerializer):
+    expandable_fields = {
+        'project': lambda: ProjectSummarySerializer(read_only=True),
+        'assignee': lambda: MemberSerializer(read_only=True),
+    }
 
-class TaskSerializer(serializers.ModelSerializer):
     class Meta:
         model = Task
         fields = ['id', 'title', 'description', 'status', 'project', 'assignee']
+        list_serializer_class = TaskBulkSerializer
+
 
+class DocumentSerializer(ProjectMemberMixin, DynamicFieldsMixin, serializers.ModelSerializer):
+    expandable_fields = {
+        'project': lambda: ProjectSummarySerializer(read_only=True),
+    }
 
-class DocumentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Document
         fields = ['id', 'name', 'description', 'file', 'version', 'project']
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(ProjectMemberMixin, serializers.ModelSerializer):
     class Meta:
         model = Comment
         fields = ['id', 'text', 'created_at', 'task', 'project']
@@ -80,13 +331,53 @@ class LoginSerializer(serializers.Serializer):
 
         return {'user': user}
 
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = ClaimsRefreshToken
+
+
+class RevocableTokenRefreshSerializer(TokenRefreshSerializer):
+    def validate(self, attrs):
+        check_not_revoked(RefreshToken(attrs['refresh']))
+        try:
+            return super().validate(attrs)
+        except CustomUser.DoesNotExist:
+            # The user was deleted after the token was issued.
+            raise AuthenticationFailed(self.error_messages['no_active_account'], 'no_active_account')
+
+
 class TimelineEventSerializer(serializers.ModelSerializer):
+    description = serializers.SerializerMethodField()
+
     class Meta:
         model = TimelineEvent
-        fields = '__all__'
+        fields = ['id', 'event_type', 'description', 'payload', 'timestamp', 'project', 'task', 'document', 'comment', 'user']
+
+    def get_description(self, event):
+        return event.describe()
 
 
 class NotificationSerializer(serializers.ModelSerializer):
+    message = serializers.SerializerMethodField()
+
     class Meta:
         model = Notification
-        fields = ['id', 'message', 'is_read', 'timestamp']
\ No newline at end of file
+        fields = ['id', 'message', 'event', 'is_read', 'timestamp']
+
+    def get_message(self, notification):
+        return notification.render()
+
+
+class ProjectStatsSerializer(serializers.ModelSerializer):
+    tasks = serializers.SerializerMethodField()
+    tasks_total = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ProjectStats
+        fields = ['project', 'tasks', 'tasks_total', 'documents', 'comments', 'last_activity']
+
+    def get_tasks(self, stats):
+        return {status: getattr(stats, field) for status, field in ProjectStats.TASK_FIELDS.items()}
+
+    def get_tasks_total(self, stats):
+        return sum(getattr(stats, field) for field in ProjectStats.TASK_FIELDS.values())
+
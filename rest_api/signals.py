@@ -0,0 +1,89 @@
+from django.db import models
+from django.db.models.signals import m2m_changed, post_delete, post_migrate, pre_delete
+from django.dispatch import receiver
+
+from . import cache, membership, notifications, search
+from .pubsub import hub, project_channel
+from .managers import events_recorded
+from .models import (
+    CustomUser, Document, Notification, NotificationCounter, Profile, Project, ProjectStats, Task, TimelineEvent,
+)
+
+
+@receiver(m2m_changed, sender=Project.team_members.through)
+def team_members_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    # reverse=True means user.project_member was edited: instance is a user
+    # and pk_set holds project ids.
+    if action == "pre_clear":
+        related = instance.project_member if reverse else instance.team_members
+        instance._cleared_pks = set(related.values_list("pk", flat=True))
+        return
+    if not action.startswith("post_"):
+        return
+    if action == "post_clear":
+        pk_set = getattr(instance, "_cleared_pks", set())
+    if reverse:
+        user_ids, project_ids = [instance.pk], pk_set
+    else:
+        user_ids, project_ids = pk_set, [instance.pk]
+    membership.invalidate(user_ids)
+    for project_id in project_ids:
+        cache.invalidate(Project, project_id)
+
+
+@receiver(pre_delete, sender=Project)
+def project_deleted(sender, instance, **kwargs):
+    membership.invalidate(instance.team_members.values_list("pk", flat=True))
+
+
+@receiver(post_delete, sender=Task)
+def task_deleted(sender, instance, origin=None, **kwargs):
+    # Here rather than in Task.delete() so the cascade from deleting the
+    # assignee is counted too. A deleted project takes its stats with it.
+    if isinstance(origin, Project):
+        return
+    ProjectStats.objects.adjust([(instance.project_id, ProjectStats.task_field(instance.status), -1)])
+
+
+@receiver(post_delete, sender=Notification)
+def notification_deleted(sender, instance, origin=None, **kwargs):
+    # Notifications go by cascade from their event, whichever of its
+    # project, task, document, comment or author was deleted. A deleted
+    # user takes their counter with them.
+    if instance.is_read or (isinstance(origin, CustomUser) and origin.pk == instance.user_id):
+        return
+    NotificationCounter.objects.add({instance.user_id: -1})
+
+
+@receiver(post_delete, sender=Document)
+@receiver(post_delete, sender=Profile)
+def release_files(sender, instance, **kwargs):
+    # Also runs for rows deleted by cascade (a project's documents, a user's
+    # profile), which never reach Model.delete().
+    for field in sender._meta.get_fields():
+        if isinstance(field, models.FileField):
+            file = getattr(instance, field.attname)
+            if file:
+                file.storage.delete(file.name)
+
+
+@receiver(events_recorded, sender=TimelineEvent)
+def notify_team_members(sender, events, **kwargs):
+    notifications.schedule(events)
+
+
+@receiver(events_recorded, sender=TimelineEvent)
+def publish_timeline_events(sender, events, **kwargs):
+    for event in events:
+        if event.project_id:
+            hub.publish(project_channel(event.project_id), {
+                'type': 'timeline', 'id': event.pk, 'event_type': event.event_type, 'project': event.project_id,
+            })
+
+
+@receiver(post_migrate)
+def restore_search_triggers(sender, using, **kwargs):
+    # A migration that remakes a task, document or comment table (SQLite's
+    # way to alter most columns) drops its search triggers.
+    if sender.name == 'rest_api':
+        search.ensure_triggers(using)
@@ -0,0 +1,99 @@
+import hashlib
+import os
+import tempfile
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from . import thumbnails
+from .models import StoredBlob
+
+BLOB_PREFIX = 'blobs'
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Stores each distinct upload once, as blobs/<ab>/<sha256><ext>.
+
+    The upload is hashed while it is streamed to a temporary file, which is
+    renamed into place if the blob is new and dropped if it is already
+    stored. StoredBlob counts the references to each blob; delete() drops
+    one, and once the transaction has committed a blob left at zero is
+    removed with its thumbnails. Names outside blobs/ (uploads from before
+    this storage) are left alone.
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+
+        tmp, digest, size = self._spool(content)
+        try:
+            name = self.blob_name(digest, name)
+            if StoredBlob.objects.filter(name=name, refcount__gt=0).update(refcount=F('refcount') + 1):
+                return name
+            # Claim the blob before writing it: delete_unreferenced() only
+            # removes blobs whose row it deletes at zero, so once the claim
+            # commits the file stays.
+            try:
+                with transaction.atomic():
+                    StoredBlob.objects.create(name=name, size=size, refcount=1)
+            except IntegrityError:
+                # Another upload of the same bytes registered the blob first,
+                # or it is waiting for its file to be removed.
+                StoredBlob.objects.filter(name=name).update(refcount=F('refcount') + 1)
+            self._move(tmp, name)
+            tmp = None
+            return name
+        finally:
+            if tmp is not None:
+                os.unlink(tmp)
+
+    def _spool(self, content):
+        """Copy `content` to a temporary file, returning (path, sha256 hex, size)."""
+        directory = self.path(f'{BLOB_PREFIX}/tmp')
+        os.makedirs(directory, exist_ok=True)
+        digest, size = hashlib.sha256(), 0
+        with tempfile.NamedTemporaryFile(dir=directory, delete=False) as tmp:
+            for chunk in content.chunks():
+                digest.update(chunk)
+                size += len(chunk)
+                tmp.write(chunk)
+        return tmp.name, digest.hexdigest(), size
+
+    def _move(self, tmp, name):
+        # A rename: a concurrent upload of the same bytes may race us, and
+        # readers never see a partial blob.
+        full_path = self.path(name)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        if self.file_permissions_mode is not None:
+            os.chmod(tmp, self.file_permissions_mode)
+        os.replace(tmp, full_path)
+
+    def blob_name(self, digest, name):
+        ext = os.path.splitext(name)[1].lower()[:16]
+        return f'{BLOB_PREFIX}/{digest[:2]}/{digest}{ext}'
+
+    def get_available_name(self, name, max_length=None):
+        # Blob names are derived from content: the same name means the same bytes.
+        return name
+
+    def delete(self, name):
+        if not name.startswith(f'{BLOB_PREFIX}/'):
+            return
+        released = StoredBlob.objects.filter(name=name, refcount__gt=0).update(refcount=F('refcount') - 1)
+        if released and StoredBlob.objects.filter(name=name, refcount=0).exists():
+            transaction.on_commit(lambda: self.delete_unreferenced(name))
+
+    def delete_unreferenced(self, name):
+        # The DELETE waits for, then sees, any upload of the same bytes that
+        # claimed the blob again; the file goes in the same transaction, so
+        # an upload that comes after it writes the file anew.
+        with transaction.atomic():
+            if StoredBlob.objects.filter(name=name, refcount=0).delete()[0]:
+                super().delete(name)
+                thumbnails.delete_variants(name)
@@ -0,0 +1,31 @@
+import itertools
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+
+
+def is_asgi(request):
+    # Under ASGI, Django buffers a sync streaming_content completely before
+    # sending it, so streaming views hand it an async iterator instead.
+    return isinstance(getattr(request, '_request', request), ASGIRequest)
+
+
+async def abatches(iterable, size):
+    """
+    Lists of up to `size` items of a sync iterable, each taken on the
+    request's sync thread so a server-side cursor stays on its connection.
+    """
+    iterator = iter(iterable)
+    take = sync_to_async(lambda: list(itertools.islice(iterator, size)))
+    while batch := await take():
+        yield batch
+
+
+async def ablocks(file, size=64 * 1024):
+    """The blocks of an open file, read off the event loop; closes it when done."""
+    read = sync_to_async(file.read, thread_sensitive=False)
+    try:
+        while block := await read(size):
+            yield block
+    finally:
+        file.close()
@@ -1,3 +1,271 @@
+from datetime import datetime, timezone
+
+from django.db import connection
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from . import rollups, search
+from .authentication import ClaimsRefreshToken
+from .models import (
+    CustomUser, Notification, NotificationCounter, Project, ProjectActivityDay, ProjectStats, RollupTaskState, Task,
+    TimelineEvent,
+)
+
+
+class TaskListingQueryPlanTests(TestCase):
+    """Each task list filter is answered from an index, never a table scan."""
+
+    def plan(self, tasks, ordering=('id',)):
+        return tasks.order_by(*ordering)[:50].explain()
+
+    def assertSearchesIndex(self, plan, index=None):
+        self.assertIn('SEARCH rest_api_task USING', plan)
+        self.assertNotIn('SCAN rest_api_task', plan)
+        if index:
+            self.assertIn(index, plan)
+
+    def test_project(self):
+        plan = self.plan(Task.objects.filter(project_id=1).filter_listing())
+        self.assertSearchesIndex(plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_project_status(self):
+        plan = self.plan(Task.objects.filter(project_id=1).filter_listing(status='o'))
+        self.assertSearchesIndex(plan, 'task_project_status_idx (project_id=? AND status=?)')
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_project_statuses(self):
+        plan = self.plan(Task.objects.filter(project_id=1).filter_listing(status=['o', 'wq']))
+        self.assertSearchesIndex(plan)
+
+    def test_my_tasks(self):
+        tasks = Task.objects.filter(project_id__in=[1, 2]).filter_listing(status='wq', assignee_id=1)
+        self.assertSearchesIndex(self.plan(tasks), '(assignee_id=?)')
+
+    def test_title_prefix(self):
+        plan = self.plan(Task.objects.filter(project_id=1).filter_listing(title_prefix='Log'), ('title', 'id'))
+        self.assertSearchesIndex(plan, 'task_project_title_idx (project_id=? AND title>? AND title<?)')
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_title_prefix_of_the_last_code_point(self):
+        user = CustomUser.objects.create_user(email='member@example.com', password='x')
+        project = Project.objects.create(title='P', description='', start_date='2020-01-01', end_date='2099-01-01')
+        task = Task.objects.create(title='Log\U0010ffff\U0010ffffx', description='', status='o', project=project, assignee=user)
+        for prefix in ('Log\U0010ffff', '\U0010ffff'):
+            tasks = Task.objects.filter(project=project).filter_listing(title_prefix=prefix)
+            self.assertEqual(list(tasks), [task] if prefix.startswith('Log') else [])
+
+
+class TaskListConditionalTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(email='member@example.com', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def project(self, **kwargs):
+        return Project.objects.create(title='P', description='', start_date='2020-01-01', end_date='2099-01-01', **kwargs)
+
+    def test_my_tasks_change_when_joining_a_project(self):
+        # The project joined has no event newer than the user's own project.
+        with self.captureOnCommitCallbacks(execute=True):
+            other = self.project()
+            Task.objects.create(title='T', description='', status='o', project=other, assignee=self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.project().team_members.add(self.user)
+        first = self.client.get('/api/tasks/?assignee=me')
+        self.assertEqual(first.data['results'], [])
+
+        other.team_members.add(self.user)
+        replay = self.client.get('/api/tasks/?assignee=me', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(replay.status_code, 200)
+        self.assertEqual(len(replay.data['results']), 1)
+
+
+class BulkUpdateTests(TestCase):
+    def test_duplicate_ids_are_rejected(self):
+        user = CustomUser.objects.create_user(email='member@example.com', password='x')
+        project = Project.objects.create(title='P', description='', start_date='2020-01-01', end_date='2099-01-01')
+        project.team_members.add(user)
+        other = CustomUser.objects.create_user(email='other@example.com', password='x')
+        tasks = [
+            Task.objects.create(title=f'T{i}', description='', status='o', project=project, assignee=assignee)
+            for i, assignee in enumerate([user, other])
+        ]
+        client = APIClient()
+        client.force_authenticate(user)
+
+        response = client.patch('/api/tasks/bulk/', [
+            {'id': tasks[0].pk, 'status': 'w'},
+            {'id': tasks[0].pk, 'status': 'r'},
+        ], format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data[1]['id'], ['Duplicate id in batch.'])
+        stats = ProjectStats.objects.get(pk=project.pk)
+        self.assertEqual((stats.tasks_open, stats.tasks_working, stats.tasks_review), (2, 0, 0))
+
+
+class TimelinePaginationTests(TestCase):
+    def test_pages_across_identical_timestamps(self):
+        user = CustomUser.objects.create_user(email='member@example.com', password='x')
+        project = Project.objects.create(title='P', description='', start_date='2020-01-01', end_date='2099-01-01')
+        project.team_members.add(user)
+        TimelineEvent.objects.bulk_create(
+            TimelineEvent(event_type='project_updated', project=project) for _ in range(5)
+        )
+        TimelineEvent.objects.update(timestamp=datetime(2024, 1, 1, tzinfo=timezone.utc))
+        client = APIClient()
+        client.force_authenticate(user)
+
+        ids, url, pages = [], '/api/timeline/?page_size=2', []
+        while url:
+            page = client.get(url).data
+            pages.append(page)
+            ids += [event['id'] for event in page['results']]
+            url = page['next']
+        expected = list(TimelineEvent.objects.order_by('-id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+        self.assertEqual(len(pages), 3)
+
+        back = client.get(pages[-1]['previous']).data
+        self.assertEqual([event['id'] for event in back['results']], expected[2:4])
+        self.assertEqual(client.get(back['previous']).data['results'], pages[0]['results'])
+
+    def test_member_feed_merges_projects(self):
+        user = CustomUser.objects.create_user(email='member@example.com', password='x')
+        projects = [
+            Project.objects.create(title=f'P{i}', description='', start_date='2020-01-01', end_date='2099-01-01')
+            for i in range(3)
+        ]
+        for project in projects[:2]:
+            project.team_members.add(user)
+        TimelineEvent.objects.bulk_create(
+            TimelineEvent(event_type='project_updated', project=projects[i % 3]) for i in range(9)
+        )
+        for event in TimelineEvent.objects.all():
+            TimelineEvent.objects.filter(pk=event.pk).update(timestamp=datetime(2024, 1, 1 + event.pk % 4, tzinfo=timezone.utc))
+        client = APIClient()
+        client.force_authenticate(user)
+
+        ids, url = [], '/api/timeline/?page_size=2'
+        while url:
+            page = client.get(url).data
+            ids += [event['id'] for event in page['results']]
+            url = page['next']
+        expected = TimelineEvent.objects.filter(project__in=projects[:2]).order_by('-timestamp', '-id')
+        self.assertEqual(ids, list(expected.values_list('id', flat=True)))
+
+
+class ProjectCreateTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(email='member@example.com', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_creator_joins_the_team(self):
+        response = self.client.post('/api/projects/', {
+            'title': 'P', 'description': 'D', 'start_date': '2020-01-01', 'end_date': '2099-01-01',
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['team_members'], [self.user.pk])
+        self.assertEqual(self.client.get(f"/api/projects/{response.data['id']}/").status_code, 200)
+
+    def test_creator_joins_bulk_created_teams(self):
+        other = CustomUser.objects.create_user(email='other@example.com', password='x')
+        response = self.client.post('/api/projects/bulk/', [
+            {'title': 'P', 'description': 'D', 'start_date': '2020-01-01', 'end_date': '2099-01-01'},
+            {'title': 'Q', 'description': 'D', 'start_date': '2020-01-01', 'end_date': '2099-01-01',
+             'team_members': [other.pk, self.user.pk]},
+        ], format='json')
+        self.assertEqual(response.status_code, 201)
+        teams = [set(Project.objects.get(pk=project['id']).team_members.values_list('pk', flat=True))
+                 for project in response.data]
+        self.assertEqual(teams, [{self.user.pk}, {self.user.pk, other.pk}])
+
+
+class NotificationCounterTests(TestCase):
+    def test_cascade_deletes_are_discounted(self):
+        member = CustomUser.objects.create_user(email='member@example.com', password='x')
+        author = CustomUser.objects.create_user(email='author@example.com', password='x')
+        project = Project.objects.create(title='P', description='', start_date='2020-01-01', end_date='2099-01-01')
+        events = TimelineEvent.objects.bulk_create(
+            TimelineEvent(event_type='project_updated', project=project, user=author) for _ in range(3)
+        )
+        Notification.objects.bulk_create(Notification(user=member, event=event) for event in events)
+        Notification.objects.filter(event=events[0]).update(is_read=True)
+        self.assertEqual(NotificationCounter.objects.unread(member.pk), 2)
+
+        author.delete()
+
+        self.assertEqual(NotificationCounter.objects.unread(member.pk), 0)
+        self.assertEqual(NotificationCounter.objects.get(pk=member.pk).unread, Notification.objects.count())
+
+
+class SearchTriggerTests(TestCase):
+    def stored_triggers(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND name GLOB '*_search_a?'")
+            return dict(cursor.fetchall())
+
+    def test_migrations_leave_every_trigger(self):
+        self.assertEqual(self.stored_triggers(), search.triggers())
+
+    def test_missing_triggers_are_restored(self):
+        with connection.cursor() as cursor:
+            cursor.execute("DROP TRIGGER rest_api_task_search_ai")
+        user = CustomUser.objects.create_user(email='member@example.com', password='x')
+        project = Project.objects.create(title='P', description='', start_date='2020-01-01', end_date='2099-01-01')
+        Task.objects.create(title='Unindexed', description='', status='o', project=project, assignee=user)
+
+        self.assertEqual(search.ensure_triggers(), ['rest_api_task_search_ai'])
+        self.assertEqual(self.stored_triggers(), search.triggers())
+        self.assertEqual([hit['title'] for hit in search.search('unindexed', [project.pk])], ['Unindexed'])
+
+
+class TokenRefreshTests(TestCase):
+    def test_deleted_user_cannot_refresh(self):
+        user = CustomUser.objects.create_user(email='member@example.com', password='x')
+        refresh = ClaimsRefreshToken.for_user(user)
+        user.delete()
+
+        response = APIClient().post('/api/token/refresh/', {'refresh': str(refresh)}, format='json')
+        self.assertEqual(response.status_code, 401)
+
+
+class RollupTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(email='member@example.com', password='x')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.project = self.create_project('P')
+            self.task = Task.objects.create(title='T', description='', status='o', project=self.project, assignee=self.user)
+
+    def create_project(self, title):
+        return Project.objects.create(title=title, description='', start_date='2020-01-01', end_date='2099-01-01')
+
+    def flows(self, project):
+        return list(ProjectActivityDay.objects.filter(project=project).values_list(*rollups.FLOWS))
+
+    def test_resumes_from_the_cursor(self):
+        self.assertEqual(rollups.build(batch_size=1), 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.task.status = rollups.RELEASED
+            self.task.save()
+
+        self.assertEqual(rollups.build(batch_size=1), 1)
+        self.assertEqual(rollups.build(), 0)
+        self.assertEqual(self.flows(self.project), [(1, 1, 0)])
+
+    def test_deleted_task_leaves_the_backlog_it_was_counted_in(self):
+        rollups.build()
+        with self.captureOnCommitCallbacks(execute=True):
+            # Moved, then deleted before the rollups saw the move.
+            other = self.create_project('Q')
+            self.task.project = other
+            self.task.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.task.delete()
 
-# Create your tests here.
+        rollups.build()
+        self.assertEqual(self.flows(self.project), [(1, 0, 1)])
+        self.assertEqual(self.flows(other), [(0, 0, 0)])
+        self.assertFalse(RollupTaskState.objects.exists())
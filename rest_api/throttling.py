@@ -0,0 +1,125 @@
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.db.models import F
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+from .models import CustomUser, RateLimit
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    In-memory token bucket per user (per client IP for anonymous requests).
+
+    The rate comes from ``DEFAULT_THROTTLE_RATES`` under the view's
+    ``throttle_scope`` if it has one, otherwise under ``scope``. Request
+    counts of authenticated users are written to ``RateLimit`` every
+    ``RATE_LIMIT_FLUSH_INTERVAL`` seconds instead of on every request.
+    """
+    scope = 'user'
+
+    _buckets = {}
+    _pending = {}
+    _last_flush = time.monotonic()
+    _lock = threading.Lock()
+
+    def allow_request(self, request, view):
+        scope = getattr(view, 'throttle_scope', None) or self.scope
+        rates = api_settings.DEFAULT_THROTTLE_RATES
+        rate = rates.get(scope) or rates.get(self.scope)
+        if rate is None:
+            return True
+        capacity, duration = self.parse_rate(rate)
+        self.refill_rate = refill_rate = capacity / duration
+
+        user_id = self.get_user_id(request)
+        key = (scope, user_id if user_id is not None else self.get_ident(request))
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.get(key, (capacity, now))[:2]
+            tokens = min(capacity, tokens + (now - last) * refill_rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now, capacity, refill_rate)
+            self.tokens = tokens
+            if user_id is not None:
+                self._pending[user_id] = self._pending.get(user_id, 0) + 1
+            flush = now - TokenBucketThrottle._last_flush >= settings.RATE_LIMIT_FLUSH_INTERVAL
+            if flush:
+                TokenBucketThrottle._last_flush = now
+                pending = dict(self._pending)
+                self._pending.clear()
+                self._prune(now)
+        if flush:
+            # Not inside the request's transaction: a failed flush must not
+            # fail the unrelated request that happened to trigger it.
+            transaction.on_commit(lambda: self.flush_safely(pending))
+        return allowed
+
+    def wait(self):
+        return max(0.0, (1 - self.tokens) / self.refill_rate)
+
+    def get_user_id(self, request):
+        if request.user and request.user.is_authenticated:
+            return request.user.pk
+        return None
+
+    def parse_rate(self, rate):
+        num, period = rate.split('/')
+        duration = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}[period[0]]
+        return int(num), duration
+
+    def _prune(self, now):
+        # A bucket idle long enough to be full again carries no state.
+        for key, (tokens, last, capacity, refill_rate) in list(self._buckets.items()):
+            if tokens + (now - last) * refill_rate >= capacity:
+                del self._buckets[key]
+
+    @classmethod
+    def flush_safely(cls, pending):
+        try:
+            with transaction.atomic():
+                cls.flush(pending)
+        except DatabaseError:
+            logger.exception("Could not write request counts of %d users", len(pending))
+
+    @staticmethod
+    def flush(pending):
+        # Tokens outlive their users (they are not looked up on each request).
+        pending = {
+            user_id: pending[user_id]
+            for user_id in CustomUser.objects.filter(pk__in=pending).values_list('pk', flat=True)
+        }
+        if not pending:
+            return
+        existing = set(
+            RateLimit.objects.filter(user_id__in=pending).values_list('user_id', flat=True)
+        )
+        by_count = {}
+        for user_id, count in pending.items():
+            if user_id in existing:
+                by_count.setdefault(count, []).append(user_id)
+        for count, user_ids in by_count.items():
+            RateLimit.objects.filter(user_id__in=user_ids).update(req_count=F('req_count') + count)
+        RateLimit.objects.bulk_create(
+            [RateLimit(user_id=user_id, req_count=count) for user_id, count in pending.items() if user_id not in existing],
+            ignore_conflicts=True,
+        )
+
+
+class LoginRateThrottle(TokenBucketThrottle):
+    scope = 'login'
+
+    def get_user_id(self, request):
+        return None
+
+
+class RegisterRateThrottle(LoginRateThrottle):
+    scope = 'register'
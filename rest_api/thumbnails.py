@@ -0,0 +1,67 @@
+import logging
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import transaction
+from PIL import Image, ImageOps
+
+from . import executors
+
+# Variants never change for a given source name (uploads are named by their
+# content digest), so they are written once and only deleted with the blob.
+storage = FileSystemStorage(allow_overwrite=True)
+
+logger = logging.getLogger(__name__)
+
+
+def get_executor():
+    return executors.get("thumbnails", settings.THUMBNAIL_WORKERS)
+
+
+def variant_name(name, size):
+    return f'thumbnails/{os.path.splitext(name)[0]}/{size}.jpg'
+
+
+def generate(name):
+    """Write every missing variant of the stored image `name`."""
+    missing = {size: px for size, px in settings.THUMBNAIL_SIZES.items()
+               if not storage.exists(variant_name(name, size))}
+    if not missing:
+        return
+    with default_storage.open(name, 'rb') as f:
+        image = ImageOps.exif_transpose(Image.open(f)).convert('RGB')
+    for size, px in missing.items():
+        variant = image.copy()
+        variant.thumbnail((px, px), Image.LANCZOS)
+        out = ContentFile(b'')
+        variant.save(out, 'JPEG', quality=85, optimize=True)
+        storage.save(variant_name(name, size), out)
+
+
+def generate_in_thread(name):
+    # Nobody waits on the future, so a failure would otherwise vanish.
+    try:
+        generate(name)
+    except Exception:
+        logger.exception("Could not generate thumbnails of %s", name)
+
+
+def schedule(name):
+    """Generate the variants in the worker pool once the upload has committed."""
+    transaction.on_commit(lambda: get_executor().submit(generate_in_thread, name))
+
+
+def delete_variants(name):
+    for size in settings.THUMBNAIL_SIZES:
+        storage.delete(variant_name(name, size))
+
+
+def variant_urls(name):
+    """URL of each variant of `name` that has been generated so far."""
+    return {
+        size: storage.url(variant_name(name, size))
+        for size in settings.THUMBNAIL_SIZES
+        if storage.exists(variant_name(name, size))
+    }
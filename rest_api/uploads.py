@@ -0,0 +1,78 @@
+import hashlib
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import UploadSession
+
+BLOCK_SIZE = 64 * 1024
+
+
+class ChunkError(Exception):
+    pass
+
+
+def session_path(session):
+    return os.path.join(settings.CHUNKED_UPLOAD_DIR, f'{session.pk}.part')
+
+
+def start(session):
+    os.makedirs(settings.CHUNKED_UPLOAD_DIR, exist_ok=True)
+    open(session_path(session), 'wb').close()
+
+
+def expected_size(session, index):
+    if index < session.chunk_count - 1:
+        return session.chunk_size
+    return session.total_size - index * session.chunk_size
+
+
+def write_chunk(session, index, stream, length, checksum=None):
+    """
+    Append chunk `index` to the session's file, reading `length` bytes from
+    `stream` in small blocks so the chunk is never held in memory.
+
+    Only the next chunk is written; the file is first cut back to the bytes
+    already acknowledged, so whatever an interrupted attempt left behind is
+    overwritten. A wrong length or SHA-256 discards the chunk and raises
+    ChunkError. The caller saves the session.
+    """
+    if length != expected_size(session, index):
+        raise ChunkError(f'Chunk {index} must be {expected_size(session, index)} bytes')
+
+    digest = hashlib.sha256()
+    written = 0
+    with open(session_path(session), 'r+b') as f:
+        f.seek(session.received)
+        f.truncate()
+        while written < length:
+            block = stream.read(min(BLOCK_SIZE, length - written))
+            if not block:
+                break
+            f.write(block)
+            digest.update(block)
+            written += len(block)
+        if written != length or (checksum and checksum.lower() != digest.hexdigest()):
+            f.truncate(session.received)
+            raise ChunkError(f'Chunk {index} was incomplete or corrupt')
+
+    session.next_chunk = index + 1
+    session.received += written
+
+
+def discard(session):
+    try:
+        os.remove(session_path(session))
+    except FileNotFoundError:
+        pass
+
+
+def purge_expired():
+    """Drop sessions that have been idle longer than CHUNKED_UPLOAD_EXPIRY."""
+    cutoff = timezone.now() - timedelta(seconds=settings.CHUNKED_UPLOAD_EXPIRY)
+    expired = UploadSession.objects.filter(updated_at__lt=cutoff)
+    for session in expired.only('pk'):
+        discard(session)
+    expired.delete()
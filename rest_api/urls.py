@@ -2,19 +2,41 @@ from django.urls import path
 from . import views
 from .views import logout_user, register_user, login_user, ProjectListCreateView, ProjectDetailView, MarkNotificationAsReadView, ListNotificationsView
 from .views import TaskDetailView, TaskAssignView, TaskListCreateView, DocumentDetailView, DocumentListCreateView, ListTimelineEventsView
+from .views import ProjectBulkView, TaskBulkView, CacheStatsView, login_user_async, register_user_async, UserImportView, ProjectExportView
+from .views import UploadSessionCreateView, UploadSessionView, UploadChunkView, UploadCompleteView, DocumentDownloadView
+from .views import UnreadNotificationCountView, MarkNotificationsReadView, notification_stream, notification_poll, SearchView, ProjectStatsView, ProjectBurndownView
 urlpatterns = [
     path('', views.UserData.as_view()),
     path('api/register/', register_user, name='register_user'),
     path('api/login/', login_user, name='login'),
     path('api/logout/', logout_user, name='logout_user'),
+    path('api/async/register/', register_user_async, name='register_user_async'),
+    path('api/async/login/', login_user_async, name='login_async'),
+    path('api/users/import/', UserImportView.as_view(), name='user_import'),
     path('api/projects/', ProjectListCreateView.as_view(), name='project_list_create'),
+    path('api/projects/bulk/', ProjectBulkView.as_view(), name='project_bulk'),
     path('api/projects/<int:project_id>/', ProjectDetailView.as_view(), name='project_detail'),
+    path('api/projects/<int:project_id>/stats/', ProjectStatsView.as_view(), name='project_stats'),
+    path('api/projects/<int:project_id>/burndown/', ProjectBurndownView.as_view(), name='project_burndown'),
+    path('api/projects/<int:project_id>/export/<str:resource>/', ProjectExportView.as_view(), name='project_export'),
     path('api/tasks/', TaskListCreateView.as_view(), name='task_list_create'),
+    path('api/tasks/bulk/', TaskBulkView.as_view(), name='task_bulk'),
     path('api/tasks/<int:task_id>/', TaskDetailView.as_view(), name='task_detail'),
     path('api/tasks/<int:task_id>/assign/', TaskAssignView.as_view(), name='task_assign'),
      path('api/documents/', DocumentListCreateView.as_view(), name='document_list_create'),
+    path('api/documents/uploads/', UploadSessionCreateView.as_view(), name='upload_create'),
+    path('api/documents/uploads/<uuid:upload_id>/', UploadSessionView.as_view(), name='upload_detail'),
+    path('api/documents/uploads/<uuid:upload_id>/chunks/<int:index>/', UploadChunkView.as_view(), name='upload_chunk'),
+    path('api/documents/uploads/<uuid:upload_id>/complete/', UploadCompleteView.as_view(), name='upload_complete'),
     path('api/documents/<int:document_id>/', DocumentDetailView.as_view(), name='document_detail'),
+    path('api/documents/<int:document_id>/download/', DocumentDownloadView.as_view(), name='document_download'),
+    path('api/cache/stats/', CacheStatsView.as_view(), name='cache_stats'),
+    path('api/search/', SearchView.as_view(), name='search'),
     path('api/timeline/', ListTimelineEventsView.as_view(), name='list_timeline_events'),
     path('api/notifications/', ListNotificationsView.as_view(), name='list_notifications'),
-    path('api/notifications/<int:id>/mark_read/', MarkNotificationAsReadView.as_view(), name='mark_notification_as_read'),
+    path('api/notifications/stream/', notification_stream, name='notification_stream'),
+    path('api/notifications/poll/', notification_poll, name='notification_poll'),
+    path('api/notifications/unread_count/', UnreadNotificationCountView.as_view(), name='unread_notification_count'),
+    path('api/notifications/mark_read/', MarkNotificationsReadView.as_view(), name='mark_notifications_read'),
+    path('api/notifications/<int:notification_id>/mark_read/', MarkNotificationAsReadView.as_view(), name='mark_notification_as_read'),
 ]
\ No newline at end of file
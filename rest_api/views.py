@@ -1,17 +1,46 @@
-from django.shortcuts import get_object_or_404
+import io
+import json
+import os
+from datetime import timedelta
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+
 from rest_framework.permissions import AllowAny
 from rest_framework import generics
 from rest_framework.response import Response
 from rest_framework.decorators import APIView
-from .serializer import UserSerializer, LoginSerializer, ProjectSerializer, TaskSerializer, DocumentSerializer, CommentSerializer, TimelineEventSerializer, NotificationSerializer
+from rest_framework.parsers import MultiPartParser
+from .serializer import UserSerializer, LoginSerializer, ProjectSerializer, TaskSerializer, DocumentSerializer, CommentSerializer, TimelineEventSerializer, NotificationSerializer, ProjectStatsSerializer
 from rest_framework import status
-from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed, NotFound
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from .models import CustomUser, Project, Task, Document, Comment, TimelineEvent, Notification, NotificationCounter, ProjectStats, UploadSession
+from . import rollups, search, uploads
+from .pagination import NotificationCursorPagination, TaskCursorPagination, TimelineCursorPagination
+from .throttling import LoginRateThrottle, RegisterRateThrottle
+from .hashing import acheck_password, ahash_password
+from .downloads import serve_file
+from .streaming import is_asgi
+from .export import FORMATS as EXPORT_FORMATS, RESOURCES as EXPORT_RESOURCES, aexport_lines, export_lines
+from .notifications import mark_read as mark_notifications_read, since as notifications_since
+from .pubsub import hub, project_channel, user_channel
+from .importers import FORMATS, guess_format, import_users, read_rows
+from .authentication import ClaimsRefreshToken, StatelessJWTAuthentication, revoke_token
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from rest_framework_simplejwt.tokens import RefreshToken
-from rest_framework.authtoken.views import ObtainAuthToken
-from rest_framework_simplejwt.authentication import JWTAuthentication
-from rest_framework.permissions import IsAuthenticated
-from .models import CustomUser, Project, Task, Document, Comment, TimelineEvent, Notification
-from rest_framework.decorators import api_view, permission_classes
+from .membership import is_member, project_ids_for
+from .cache import detail_key, get_detail_cache
+from .conditional import conditional_get, conditional_list, make_etag
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
 
 class UserData(APIView):
     # authentication_classes = [JWTAuthentication]
@@ -33,11 +62,12 @@ class UserData(APIView):
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([LoginRateThrottle])
 def login_user(request):
     serializer = LoginSerializer(data=request.data)
     if serializer.is_valid():
         user = serializer.validated_data['user']
-        refresh = RefreshToken.for_user(user)
+        refresh = ClaimsRefreshToken.for_user(user)
         return Response({
             'refresh': str(refresh),
             'access': str(refresh.access_token),
@@ -47,6 +77,7 @@ def login_user(request):
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([RegisterRateThrottle])
 def register_user(request):
     serializer = UserSerializer(data=request.data)
     if serializer.is_valid():
@@ -54,128 +85,347 @@ def register_user(request):
         return Response({"message": "user created successfully", "data": serializer.data}, status=status.HTTP_201_CREATED)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+# Async login/register for ASGI deployments (api/asgi.py). PBKDF2 runs on
+# the hashing pool, so a login spike does not hold the event loop or a
+# worker thread per request. These are plain Django views: DRF has no
+# async support.
+
+def request_data(request):
+    if request.content_type == 'application/json':
+        try:
+            return json.loads(request.body or b'{}')
+        except ValueError:
+            return None
+    return {**request.POST.dict(), **request.FILES.dict()}
+
+
+async def throttled(request, throttle_class):
+    throttle = throttle_class()
+    if await sync_to_async(throttle.allow_request)(request, None):
+        return None
+    return JsonResponse({'detail': 'Request was throttled.'}, status=status.HTTP_429_TOO_MANY_REQUESTS,
+                        headers={'Retry-After': str(int(throttle.wait()) + 1)})
+
+
+@csrf_exempt
+@require_POST
+@transaction.non_atomic_requests
+async def login_user_async(request):
+    response = await throttled(request, LoginRateThrottle)
+    if response is not None:
+        return response
+    data = request_data(request)
+    if not isinstance(data, dict) or not data.get('email') or not data.get('password'):
+        return JsonResponse({'non_field_errors': ['Email and password are required.']}, status=status.HTTP_400_BAD_REQUEST)
+
+    user = await CustomUser.objects.filter(email=data['email']).afirst()
+    if user is None:
+        # Hash anyway so unknown emails take as long as wrong passwords.
+        await ahash_password(data['password'])
+    elif user.is_active and await acheck_password(data['password'], user.password):
+        refresh = ClaimsRefreshToken.for_user(user)
+        return JsonResponse({
+            'refresh': str(refresh),
+            'access': str(refresh.access_token),
+        }, status=status.HTTP_200_OK)
+    return JsonResponse({'non_field_errors': ['Invalid credentials.']}, status=status.HTTP_400_BAD_REQUEST)
+
+
+@csrf_exempt
+@require_POST
+@transaction.non_atomic_requests
+async def register_user_async(request):
+    response = await throttled(request, RegisterRateThrottle)
+    if response is not None:
+        return response
+    data = request_data(request)
+    if data is None:
+        return JsonResponse({'error': 'Invalid JSON'}, status=status.HTTP_400_BAD_REQUEST)
+
+    serializer = UserSerializer(data=data)
+    if not await sync_to_async(serializer.is_valid)():
+        return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    password_hash = await ahash_password(serializer.validated_data['password'])
+
+    @sync_to_async
+    def save():
+        with transaction.atomic():
+            serializer.save(password_hash=password_hash)
+        return serializer.data
+
+    return JsonResponse({"message": "user created successfully", "data": await save()}, status=status.HTTP_201_CREATED)
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def logout_user(request):
     try:
-        request.user.auth_token.delete()
-    except (AttributeError, Token.DoesNotExist):
+        refresh = RefreshToken(request.data['refresh']) if request.data.get('refresh') else None
+    except TokenError:
         return Response({'error': 'Invalid token'}, status=status.HTTP_400_BAD_REQUEST)
+    revoke_token(request.auth)
+    if refresh is not None:
+        revoke_token(refresh)
     return Response({'message': 'Successfully logged out'}, status=status.HTTP_200_OK)
 
+def split_param(request, name):
+    value = request.query_params.get(name)
+    if not value:
+        return None
+    return [item.strip() for item in value.split(',') if item.strip()]
+
 # Project management
 
 class ProjectListCreateView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        user = request.user
-        projects = Project.objects.all()
-        serializer = ProjectSerializer(projects, many=True)
+        fields, expand = split_param(request, 'fields'), split_param(request, 'expand') or []
+        projects = Project.objects.filter(id__in=project_ids_for(request.user))
+        projects = ProjectSerializer.optimize_queryset(projects, fields, expand)
+        serializer = ProjectSerializer(projects, many=True, fields=fields, expand=expand)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     def post(self, request):
-        serializer = ProjectSerializer(data=request.data)
+        serializer = ProjectSerializer(data=request.data, context={'request': request})
+        if serializer.is_valid():
+            serializer.save()
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class BulkCreateUpdateView(APIView):
+    """
+    POST a list to create objects, PUT/PATCH a list of objects with ids to
+    update them. The whole batch is written in one transaction; on failure
+    the response lists the errors of each item in request order.
+    """
+    permission_classes = [IsAuthenticated]
+    throttle_scope = 'bulk'
+    model = None
+    serializer_class = None
+
+    def post(self, request):
+        serializer = self.serializer_class(data=request.data, many=True, context={'request': request})
         if serializer.is_valid():
             serializer.save()
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    def get_queryset(self, request):
+        return self.model.objects.filter(project_id__in=project_ids_for(request.user))
+
+    def put(self, request):
+        return self.update(request, partial=False)
+
+    def patch(self, request):
+        return self.update(request, partial=True)
+
+    def update(self, request, partial):
+        ids = []
+        if isinstance(request.data, list):
+            ids = [item.get('id') for item in request.data if isinstance(item, dict)]
+        instances = list(self.get_queryset(request).filter(id__in=ids))
+        serializer = self.serializer_class(instances, data=request.data, many=True, partial=partial, context={'request': request})
+        if serializer.is_valid():
+            serializer.save()
+            return Response(serializer.data, status=status.HTTP_200_OK)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
 
-class ProjectDetailView(APIView):
+class ProjectStatsView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, project_id):
-        try:
-            project = Project.objects.get(id=project_id)
-        except Project.DoesNotExist:
+        if not is_member(request.user, project_id):
             return Response({'error': 'Project not found'}, status=status.HTTP_404_NOT_FOUND)
-        
-        serializer = ProjectSerializer(project)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        stats = ProjectStats.objects.filter(project_id=project_id).first()
+        if stats is None:
+            stats = ProjectStats.objects.recount([project_id])[0]
+        return Response(ProjectStatsSerializer(stats).data, status=status.HTTP_200_OK)
+
+
+class ProjectBurndownView(APIView):
+    """
+    GET the project's burndown for the last ?days= days (at most
+    BURNDOWN_MAX_DAYS, ending today), with ?window= days of velocity.
+    Served from the rollups as of their cursor: build_rollups catches them
+    up, outside of any request.
+    """
+    permission_classes = [IsAuthenticated]
 
-    def put(self, request, project_id):
-        try:
-            project = Project.objects.get(id=project_id)
-        except Project.DoesNotExist:
+    def get(self, request, project_id):
+        if not is_member(request.user, project_id):
             return Response({'error': 'Project not found'}, status=status.HTTP_404_NOT_FOUND)
-        
-        serializer = ProjectSerializer(project, data=request.data)
+        try:
+            days = int(request.query_params.get('days', 90))
+            window = int(request.query_params.get('window', 7))
+        except ValueError:
+            return Response({'error': 'days and window must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+        if not 1 <= days <= settings.BURNDOWN_MAX_DAYS or window < 1:
+            return Response(
+                {'error': f'days must be between 1 and {settings.BURNDOWN_MAX_DAYS}, window at least 1'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        end = timezone.localdate()
+        start = end - timedelta(days=days - 1)
+        etag = make_etag('burndown', project_id, rollups.version(), start, days, window)
+        return conditional_get(
+            request, lambda: Response(rollups.burndown(project_id, start, end, window), status=status.HTTP_200_OK), etag
+        )
+
+
+class ProjectBulkView(BulkCreateUpdateView):
+    model = Project
+    serializer_class = ProjectSerializer
+
+    def get_queryset(self, request):
+        return Project.objects.filter(id__in=project_ids_for(request.user))
+
+
+class DetailView(APIView):
+    """
+    GET/PUT/DELETE on one object. GET is served from the detail cache;
+    the model save()/delete() hooks invalidate it.
+    """
+    permission_classes = [IsAuthenticated]
+    model = None
+    serializer_class = None
+    lookup_url_kwarg = None
+    not_found = None
+
+    def get_queryset(self, request):
+        return self.model.objects.filter(project_id__in=project_ids_for(request.user))
+
+    def get_object(self, request, pk):
+        try:
+            return self.get_queryset(request).get(id=pk)
+        except self.model.DoesNotExist:
+            return None
+
+    def load(self, pk):
+        try:
+            return dict(self.serializer_class(self.model.objects.get(id=pk)).data)
+        except self.model.DoesNotExist:
+            return None
+
+    def project_of(self, data):
+        return data['project']
+
+    def get(self, request, **kwargs):
+        pk = kwargs[self.lookup_url_kwarg]
+        data = get_detail_cache().get_or_load(detail_key(self.model, pk), lambda: self.load(pk))
+        if data is None or not is_member(request.user, self.project_of(data)):
+            return Response({'error': self.not_found}, status=status.HTTP_404_NOT_FOUND)
+        return conditional_get(request, lambda: Response(data, status=status.HTTP_200_OK), make_etag(data))
+
+    def put(self, request, **kwargs):
+        instance = self.get_object(request, kwargs[self.lookup_url_kwarg])
+        if instance is None:
+            return Response({'error': self.not_found}, status=status.HTTP_404_NOT_FOUND)
+
+        serializer = self.serializer_class(instance, data=request.data, context={'request': request})
         if serializer.is_valid():
             serializer.save()
             return Response(serializer.data, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-    def delete(self, request, project_id):
-        try:
-            project = Project.objects.get(id=project_id)
-        except Project.DoesNotExist:
-            return Response({'error': 'Project not found'}, status=status.HTTP_404_NOT_FOUND)
-        
-        project.delete()
-        return Response({'message': 'Project deleted successfully'}, status=status.HTTP_204_NO_CONTENT)
+    def delete(self, request, **kwargs):
+        instance = self.get_object(request, kwargs[self.lookup_url_kwarg])
+        if instance is None:
+            return Response({'error': self.not_found}, status=status.HTTP_404_NOT_FOUND)
+
+        instance.delete()
+        return Response({'message': f'{self.model.__name__} deleted successfully'}, status=status.HTTP_204_NO_CONTENT)
+
+
+class ProjectDetailView(DetailView):
+    model = Project
+    serializer_class = ProjectSerializer
+    lookup_url_kwarg = 'project_id'
+    not_found = 'Project not found'
+
+    def get_queryset(self, request):
+        return Project.objects.filter(id__in=project_ids_for(request.user))
+
+    def project_of(self, data):
+        return data['id']
 
 # Task management
 
 class TaskListCreateView(APIView):
+    """
+    GET tasks of ?project_id=, or ?assignee=me across the caller's projects.
+    Filters: status (comma separated), assignee (a user id or "me") and
+    title (a case-sensitive prefix). Cursor paginated by id, or by title
+    when filtering on a title prefix.
+    """
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
         project_id = request.query_params.get('project_id')
-        if not project_id:
+        assignee = request.query_params.get('assignee')
+        if not project_id and assignee != 'me':
             return Response({'error': 'Project ID is required'}, status=status.HTTP_400_BAD_REQUEST)
+        if project_id and not is_member(request.user, project_id):
+            return Response({'error': 'Project not found'}, status=status.HTTP_404_NOT_FOUND)
 
-        tasks = Task.objects.filter(project_id=project_id)
-        serializer = TaskSerializer(tasks, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        statuses = split_param(request, 'status')
+        if statuses and not set(statuses) <= {choice for choice, _ in Task.TASK_STATUS_CHOICES}:
+            return Response({'error': 'Unknown status'}, status=status.HTTP_400_BAD_REQUEST)
+        if assignee == 'me':
+            assignee = request.user.pk
+        elif assignee is not None:
+            if not assignee.isdigit():
+                return Response({'error': 'assignee must be a user id or "me"'}, status=status.HTTP_400_BAD_REQUEST)
+            assignee = int(assignee)
+        filters = {'status': statuses, 'assignee_id': assignee, 'title_prefix': request.query_params.get('title')}
+
+        # Every task write records a timeline event for its project. Joining
+        # a project records none, so the project set is part of the version.
+        if project_id:
+            project_ids = [int(project_id)]
+            tasks = Task.objects.filter(project_id=project_id)
+        else:
+            project_ids = sorted(project_ids_for(request.user))
+            tasks = Task.objects.filter(project_id__in=project_ids)
+        return conditional_list(request, TimelineEvent.objects.all(), lambda: self.list(request, tasks.filter_listing(**filters)),
+                                request.user.pk, *project_ids, partition=('project_id', project_ids))
+
+    def list(self, request, tasks):
+        fields, expand = split_param(request, 'fields'), split_param(request, 'expand') or []
+        tasks = TaskSerializer.optimize_queryset(tasks, fields, expand)
+        self.ordering = ('title', 'id') if request.query_params.get('title') else ('id',)
+        paginator = TaskCursorPagination()
+        page = paginator.paginate_queryset(tasks, request, view=self)
+        serializer = TaskSerializer(page, many=True, fields=fields, expand=expand)
+        return paginator.get_paginated_response(serializer.data)
 
     def post(self, request):
-        serializer = TaskSerializer(data=request.data)
+        serializer = TaskSerializer(data=request.data, context={'request': request})
         if serializer.is_valid():
             serializer.save()
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
 
-class TaskDetailView(APIView):
-    permission_classes = [IsAuthenticated]
-
-    def get(self, request, task_id):
-        try:
-            task = Task.objects.get(id=task_id)
-        except Task.DoesNotExist:
-            return Response({'error': 'Task not found'}, status=status.HTTP_404_NOT_FOUND)
-
-        serializer = TaskSerializer(task)
-        return Response(serializer.data, status=status.HTTP_200_OK)
-
-    def put(self, request, task_id):
-        try:
-            task = Task.objects.get(id=task_id)
-        except Task.DoesNotExist:
-            return Response({'error': 'Task not found'}, status=status.HTTP_404_NOT_FOUND)
-
-        serializer = TaskSerializer(task, data=request.data)
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data, status=status.HTTP_200_OK)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+class TaskBulkView(BulkCreateUpdateView):
+    model = Task
+    serializer_class = TaskSerializer
 
-    def delete(self, request, task_id):
-        try:
-            task = Task.objects.get(id=task_id)
-        except Task.DoesNotExist:
-            return Response({'error': 'Task not found'}, status=status.HTTP_404_NOT_FOUND)
 
-        task.delete()
-        return Response({'message': 'Task deleted successfully'}, status=status.HTTP_204_NO_CONTENT)
+class TaskDetailView(DetailView):
+    model = Task
+    serializer_class = TaskSerializer
+    lookup_url_kwarg = 'task_id'
+    not_found = 'Task not found'
 
 class TaskAssignView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request, task_id):
         try:
-            task = Task.objects.get(id=task_id)
+            task = Task.objects.get(id=task_id, project_id__in=project_ids_for(request.user))
         except Task.DoesNotExist:
             return Response({'error': 'Task not found'}, status=status.HTTP_404_NOT_FOUND)
 
@@ -202,51 +452,155 @@ class DocumentListCreateView(APIView):
         project_id = request.query_params.get('project_id')
         if not project_id:
             return Response({'error': 'Project ID is required'}, status=status.HTTP_400_BAD_REQUEST)
+        if not is_member(request.user, project_id):
+            return Response({'error': 'Project not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        # Every document write records a timeline event for its project.
+        events = TimelineEvent.objects.filter(project_id=project_id)
+        return conditional_list(request, events, lambda: self.list(request, project_id))
 
-        documents = Document.objects.filter(project_id=project_id)
-        serializer = DocumentSerializer(documents, many=True)
+    def list(self, request, project_id):
+        fields, expand = split_param(request, 'fields'), split_param(request, 'expand') or []
+        documents = DocumentSerializer.optimize_queryset(Document.objects.filter(project_id=project_id), fields, expand)
+        serializer = DocumentSerializer(documents, many=True, fields=fields, expand=expand)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     def post(self, request):
-        serializer = DocumentSerializer(data=request.data)
+        serializer = DocumentSerializer(data=request.data, context={'request': request})
         if serializer.is_valid():
             serializer.save()
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-class DocumentDetailView(APIView):
+class DocumentDownloadView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, document_id):
-        try:
-            document = Document.objects.get(id=document_id)
-        except Document.DoesNotExist:
+        document = Document.objects.filter(pk=document_id).only('name', 'project_id', 'file').first()
+        if document is None or not is_member(request.user, document.project_id):
             return Response({'error': 'Document not found'}, status=status.HTTP_404_NOT_FOUND)
+        if not document.file or not document.file.storage.exists(document.file.name):
+            return Response({'error': 'Document has no file'}, status=status.HTTP_404_NOT_FOUND)
+        # Stored names are content digests; offer the document's own name.
+        filename = document.name + os.path.splitext(document.file.name)[1]
+        return serve_file(request, document.file.storage, document.file.name, filename)
+
+# Resumable document uploads: POST the document fields with filename and
+# total_size to start, PUT each chunk in order, then POST complete/. GET on
+# a session tells an interrupted client which chunk to send next.
+
+def upload_session_data(session):
+    return {
+        'id': session.pk,
+        'filename': session.filename,
+        'total_size': session.total_size,
+        'chunk_size': session.chunk_size,
+        'chunk_count': session.chunk_count,
+        'next_chunk': session.next_chunk,
+        'received': session.received,
+    }
+
+
+class UploadSessionCreateView(APIView):
+    permission_classes = [IsAuthenticated]
 
-        serializer = DocumentSerializer(document)
-        return Response(serializer.data, status=status.HTTP_200_OK)
-
-    def put(self, request, document_id):
+    def post(self, request):
+        document = {key: request.data.get(key) for key in ('name', 'description', 'version', 'project')}
+        serializer = DocumentSerializer(data=document, context={'request': request})
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         try:
-            document = Document.objects.get(id=document_id)
-        except Document.DoesNotExist:
-            return Response({'error': 'Document not found'}, status=status.HTTP_404_NOT_FOUND)
+            total_size = int(request.data['total_size'])
+            chunk_size = int(request.data.get('chunk_size') or settings.CHUNKED_UPLOAD_CHUNK_SIZE)
+        except (KeyError, TypeError, ValueError):
+            return Response({'error': 'total_size and chunk_size must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+        if total_size < 0 or not 0 < chunk_size <= settings.CHUNKED_UPLOAD_MAX_CHUNK_SIZE:
+            return Response({'error': 'Invalid total_size or chunk_size'}, status=status.HTTP_400_BAD_REQUEST)
+        filename = os.path.basename(str(request.data.get('filename') or ''))
+        if not filename:
+            return Response({'error': 'filename is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+        uploads.purge_expired()
+        session = UploadSession.objects.create(
+            user_id=request.user.pk, document=document, filename=filename,
+            total_size=total_size, chunk_size=chunk_size,
+        )
+        uploads.start(session)
+        return Response(upload_session_data(session), status=status.HTTP_201_CREATED)
+
+
+class UploadSessionMixin:
+    permission_classes = [IsAuthenticated]
 
-        serializer = DocumentSerializer(document, data=request.data)
-        if serializer.is_valid():
+    def get_session(self, request, upload_id, lock=False):
+        sessions = UploadSession.objects.filter(user_id=request.user.pk)
+        if lock:
+            sessions = sessions.select_for_update()
+        try:
+            return sessions.get(pk=upload_id)
+        except UploadSession.DoesNotExist:
+            raise NotFound('Upload not found')
+
+
+class UploadSessionView(UploadSessionMixin, APIView):
+    def get(self, request, upload_id):
+        return Response(upload_session_data(self.get_session(request, upload_id)), status=status.HTTP_200_OK)
+
+    def delete(self, request, upload_id):
+        session = self.get_session(request, upload_id)
+        session.delete()
+        transaction.on_commit(lambda: uploads.discard(session))
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class UploadChunkView(UploadSessionMixin, APIView):
+    """
+    PUT the raw bytes of one chunk. The body is copied to disk as it is read
+    (DRF's parsers are never invoked), and an optional X-Chunk-SHA256 header
+    is checked. Re-sending an acknowledged chunk is a no-op; skipping ahead
+    is a 409 that names the chunk to send.
+    """
+
+    def put(self, request, upload_id, index):
+        session = self.get_session(request, upload_id, lock=True)
+        if index < session.next_chunk:
+            return Response(upload_session_data(session), status=status.HTTP_200_OK)
+        if index != session.next_chunk or index >= session.chunk_count:
+            return Response({'error': f'Expected chunk {session.next_chunk}', **upload_session_data(session)},
+                            status=status.HTTP_409_CONFLICT)
+        try:
+            length = int(request.headers.get('Content-Length') or 0)
+            uploads.write_chunk(session, index, request._request, length, request.headers.get('X-Chunk-SHA256'))
+        except uploads.ChunkError as e:
+            return Response({'error': str(e), **upload_session_data(session)}, status=status.HTTP_400_BAD_REQUEST)
+        session.save(update_fields=['next_chunk', 'received', 'updated_at'])
+        return Response(upload_session_data(session), status=status.HTTP_200_OK)
+
+
+class UploadCompleteView(UploadSessionMixin, APIView):
+    def post(self, request, upload_id):
+        session = self.get_session(request, upload_id, lock=True)
+        if session.received != session.total_size:
+            return Response({'error': f'Expected chunk {session.next_chunk}', **upload_session_data(session)},
+                            status=status.HTTP_409_CONFLICT)
+        with open(uploads.session_path(session), 'rb') as f:
+            serializer = DocumentSerializer(
+                data={**session.document, 'file': File(f, name=session.filename)},
+                context={'request': request},
+            )
+            if not serializer.is_valid():
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
             serializer.save()
-            return Response(serializer.data, status=status.HTTP_200_OK)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        session.delete()
+        transaction.on_commit(lambda: uploads.discard(session))
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-    def delete(self, request, document_id):
-        try:
-            document = Document.objects.get(id=document_id)
-        except Document.DoesNotExist:
-            return Response({'error': 'Document not found'}, status=status.HTTP_404_NOT_FOUND)
+class DocumentDetailView(DetailView):
+    model = Document
+    serializer_class = DocumentSerializer
+    lookup_url_kwarg = 'document_id'
+    not_found = 'Document not found'
 
-        document.delete()
-        return Response({'message': 'Document deleted successfully'}, status=status.HTTP_204_NO_CONTENT)
-    
 #Comment Management
 
 class CommentListCreateView(APIView):
@@ -258,15 +612,16 @@ class CommentListCreateView(APIView):
 
         if not task_id and not project_id:
             return Response({'error': 'Either task_id or project_id is required'}, status=status.HTTP_400_BAD_REQUEST)
+        comments = Comment.objects.filter(project_id__in=project_ids_for(request.user))
         if task_id:
-            comments = Comment.objects.filter(task_id=task_id)
+            comments = comments.filter(task_id=task_id)
         elif project_id:
-            comments = Comment.objects.filter(project_id=project_id)
+            comments = comments.filter(project_id=project_id)
         serializer = CommentSerializer(comments, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     def post(self, request):
-        serializer = DocumentSerializer(data=request.data)
+        serializer = DocumentSerializer(data=request.data, context={'request': request})
         if serializer.is_valid():
             serializer.save(user= request.user)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -277,7 +632,7 @@ class CommentDetailView(APIView):
 
     def get(self, request, comment_id):
         try:
-            comment = Comment.objects.get(id=comment_id)
+            comment = Comment.objects.get(id=comment_id, project_id__in=project_ids_for(request.user))
         except comment.DoesNotExist:
             return Response({'error': 'Comment not found'}, status=status.HTTP_404_NOT_FOUND)
 
@@ -286,11 +641,11 @@ class CommentDetailView(APIView):
 
     def put(self, request, comment_id):
         try:
-            comment = Comment.objects.get(id=comment_id)
+            comment = Comment.objects.get(id=comment_id, project_id__in=project_ids_for(request.user))
         except Comment.DoesNotExist:
             return Response({'error': 'Comment not found'}, status=status.HTTP_404_NOT_FOUND)
 
-        serializer = CommentSerializer(comment, data=request.data)
+        serializer = CommentSerializer(comment, data=request.data, context={'request': request})
         if serializer.is_valid():
             serializer.save()
             return Response(serializer.data, status=status.HTTP_200_OK)
@@ -298,50 +653,258 @@ class CommentDetailView(APIView):
 
     def delete(self, request, comment_id):
         try:
-            comment = Comment.objects.get(id=comment_id)
+            comment = Comment.objects.get(id=comment_id, project_id__in=project_ids_for(request.user))
         except Comment.DoesNotExist:
             return Response({'error': 'Comment not found'}, status=status.HTTP_404_NOT_FOUND)
 
         comment.delete()
         return Response({'message': 'Comment deleted successfully'}, status=status.HTTP_204_NO_CONTENT)
 
+class CacheStatsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(get_detail_cache().stats(), status=status.HTTP_200_OK)
+
+class SearchView(APIView):
+    """
+    GET ?q=<text> for ranked tasks, documents and comments in the caller's
+    projects. Narrow with ?project_id= and ?kind=task,document,comment;
+    page with ?limit= (at most 100) and ?offset=.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({'error': 'q is required'}, status=status.HTTP_400_BAD_REQUEST)
+        project_ids = project_ids_for(request.user)
+        project_id = request.query_params.get('project_id')
+        if project_id:
+            if not is_member(request.user, project_id):
+                return Response({'error': 'Project not found'}, status=status.HTTP_404_NOT_FOUND)
+            project_ids = [int(project_id)]
+        kinds = split_param(request, 'kind') or search.KINDS
+        if not set(kinds) <= set(search.KINDS):
+            return Response({'error': f'kind must be among {", ".join(search.KINDS)}'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = min(int(request.query_params.get('limit', 20)), 100)
+            offset = int(request.query_params.get('offset', 0))
+        except ValueError:
+            return Response({'error': 'limit and offset must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = search.search(query, sorted(project_ids), kinds, max(limit, 1), max(offset, 0))
+        return Response({'results': results}, status=status.HTTP_200_OK)
+
+# Project export
+
+class ProjectExportView(APIView):
+    """
+    Stream a project's timeline, tasks, documents or comments as NDJSON
+    (default) or CSV, chosen with ?as=. Rows are read in chunks and encoded
+    one at a time, so memory does not grow with the size of the project;
+    under ASGI the chunks go out through an async iterator.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, project_id, resource):
+        if resource not in EXPORT_RESOURCES:
+            return Response({'error': 'Unknown export'}, status=status.HTTP_404_NOT_FOUND)
+        if not is_member(request.user, project_id):
+            return Response({'error': 'Project not found'}, status=status.HTTP_404_NOT_FOUND)
+        fmt = request.query_params.get('as', 'ndjson')
+        if fmt not in EXPORT_FORMATS:
+            return Response({'error': f'Unsupported format {fmt!r}'}, status=status.HTTP_400_BAD_REQUEST)
+
+        lines = (aexport_lines if is_asgi(request) else export_lines)(resource, fmt, project_id)
+        response = StreamingHttpResponse(lines, content_type=EXPORT_FORMATS[fmt])
+        response['Content-Disposition'] = f'attachment; filename="project-{project_id}-{resource}.{fmt}"'
+        return response
+
+# Bulk user import
+
+@method_decorator(transaction.non_atomic_requests, name='dispatch')
+class UserImportView(APIView):
+    """
+    Upload a CSV or JSONL file as `file` to create users and profiles in
+    batches. Each batch commits on its own, so the request is not wrapped in
+    one transaction; the response reports every rejected row.
+    """
+    permission_classes = [IsAdminUser]
+    parser_classes = [MultiPartParser]
+    throttle_scope = 'bulk'
+
+    def post(self, request):
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'error': 'Upload the users as "file"'}, status=status.HTTP_400_BAD_REQUEST)
+        fmt = request.query_params.get('as') or guess_format(upload.name)
+        if fmt not in FORMATS:
+            return Response({'error': f'Unsupported format {fmt!r}'}, status=status.HTTP_400_BAD_REQUEST)
+
+        stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+        report = import_users(read_rows(stream, fmt))
+        return Response(report, status=status.HTTP_201_CREATED if report['created'] else status.HTTP_400_BAD_REQUEST)
+
 # TimeLine management
 
 class ListTimelineEventsView(generics.ListAPIView):
     serializer_class = TimelineEventSerializer
+    pagination_class = TimelineCursorPagination
 
     def get_queryset(self):
+        # Everything describe() reads comes in with the page in one query.
+        # The member feed is read project by project off
+        # timeline_project_ts_idx and merged by the paginator.
+        events = TimelineEvent.objects.select_related('project', 'task', 'document', 'comment', 'user')
         project_id = self.request.query_params.get('project_id', None)
         if project_id:
-            project = get_object_or_404(Project, id=project_id)
-            return TimelineEvent.objects.filter(project=project).order_by('-timestamp')
-        return TimelineEvent.objects.all().order_by('-timestamp')
-    
+            if not is_member(self.request.user, project_id):
+                raise NotFound('Project not found')
+            self.partition = None
+            return events.filter(project_id=project_id)
+        project_ids = sorted(project_ids_for(self.request.user))
+        self.partition = ('project_id', project_ids)
+        return events.filter(project_id__in=project_ids)
+
+    def list(self, request, *args, **kwargs):
+        build = partial(super().list, request, *args, **kwargs)
+        events = self.get_queryset()
+        return conditional_list(request, events, build, sorted(project_ids_for(request.user)), partition=self.partition)
+
 #Notification management
 
-class ListNotificationsView(APIView):
+class ListNotificationsView(generics.ListAPIView):
+    """Newest first, cursor paginated; ?unread=1 for unread ones only."""
     permission_classes = [IsAuthenticated]
+    serializer_class = NotificationSerializer
+    pagination_class = NotificationCursorPagination
+
+    def get_queryset(self):
+        notifications = Notification.objects.filter(user_id=self.request.user.pk).select_related(
+            'event__project', 'event__task', 'event__document', 'event__comment', 'event__user'
+        )
+        if self.request.query_params.get('unread') in ('1', 'true'):
+            notifications = notifications.filter(is_read=False)
+        return notifications
+
+
+class UnreadNotificationCountView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        return Response({'unread': NotificationCounter.objects.unread(request.user.pk)}, status=status.HTTP_200_OK)
+
+
+class MarkNotificationsReadView(APIView):
+    """POST {"ids": [...]} to mark those notifications read, or {"all": true} for every one."""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        if request.data.get('all') is True:
+            ids = None
+        else:
+            ids = request.data.get('ids')
+            if not isinstance(ids, list) or not all(isinstance(i, int) for i in ids):
+                return Response({'error': 'Pass "ids" as a list of notification ids or "all": true'},
+                                status=status.HTTP_400_BAD_REQUEST)
+        updated = mark_notifications_read(request.user.pk, ids)
+        return Response({'updated': updated, 'unread': NotificationCounter.objects.unread(request.user.pk)},
+                        status=status.HTTP_200_OK)
 
-    def get(self, request, format=None):
-        user = request.user
-        notifications = Notification.objects.filter(user=user).order_by('-timestamp')
-        serializer = NotificationSerializer(notifications, many=True)
-        return Response(serializer.data)
-    
 
 class MarkNotificationAsReadView(APIView):
     permission_classes = [IsAuthenticated]
 
     def put(self, request, notification_id, format=None):
         try:
-            notification = Notification.objects.get(id=notification_id, user=request.user)
+            notification = Notification.objects.get(id=notification_id, user_id=request.user.pk)
         except Notification.DoesNotExist:
             return Response({"detail": "Notification not found."}, status=status.HTTP_404_NOT_FOUND)
 
-        if notification.is_read:
+        if notification.is_read or not mark_notifications_read(request.user.pk, [notification.pk]):
             return Response({"detail": "Notification already read."}, status=status.HTTP_400_BAD_REQUEST)
 
         notification.is_read = True
-        notification.save()
         serializer = NotificationSerializer(notification)
-        return Response(serializer.data, status=status.HTTP_200_OK)
\ No newline at end of file
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+# Pushed notifications for ASGI deployments. Clients wait on the pub/sub hub
+# instead of polling the list, so an idle connection costs a queue and no
+# queries. EventSource cannot set headers, so the token may be passed as
+# ?token=.
+
+async def stream_user(request):
+    auth = StatelessJWTAuthentication()
+    raw_token = request.GET.get('token')
+    try:
+        if raw_token:
+            token = await sync_to_async(auth.get_validated_token)(raw_token.encode())
+            return auth.get_user(token)
+        authenticated = await sync_to_async(auth.authenticate)(request)
+    except (AuthenticationFailed, InvalidToken):
+        return None
+    return authenticated and authenticated[0]
+
+
+def sse(message):
+    event_id = f"id: {message['id']}\n" if message['type'] == 'notification' else ''
+    return f"{event_id}event: {message['type']}\ndata: {json.dumps(message)}\n\n"
+
+
+@require_GET
+@transaction.non_atomic_requests
+async def notification_stream(request):
+    """
+    Server-Sent Events: the user's notifications and the timeline events of
+    their projects. A reconnecting client sends Last-Event-ID and first gets
+    the notifications it missed.
+    """
+    user = await stream_user(request)
+    if user is None:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=status.HTTP_401_UNAUTHORIZED)
+    project_ids = await sync_to_async(project_ids_for)(user)
+    last_id = request.headers.get('Last-Event-ID')
+
+    async def events():
+        channels = [user_channel(user.pk), *(project_channel(pk) for pk in project_ids)]
+        with hub.subscribe(channels) as subscription:
+            yield f"retry: {settings.PUSH_KEEPALIVE * 1000}\n\n"
+            if last_id and last_id.isdigit():
+                for message in await sync_to_async(notifications_since)(user.pk, int(last_id)):
+                    yield sse(message)
+            while True:
+                message = await subscription.get(settings.PUSH_KEEPALIVE)
+                yield sse(message) if message else ": keepalive\n\n"
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@require_GET
+@transaction.non_atomic_requests
+async def notification_poll(request):
+    """
+    Long-poll fallback: answers at once with notifications newer than
+    ?after=<id>, otherwise waits up to LONG_POLL_TIMEOUT seconds for one.
+    """
+    user = await stream_user(request)
+    if user is None:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=status.HTTP_401_UNAUTHORIZED)
+    after = request.GET.get('after', '')
+    if after and not after.isdigit():
+        return JsonResponse({'error': 'after must be a notification id'}, status=status.HTTP_400_BAD_REQUEST)
+
+    with hub.subscribe([user_channel(user.pk)]) as subscription:
+        # Subscribed first, so nothing published during the query is lost.
+        messages = await sync_to_async(notifications_since)(user.pk, int(after)) if after else []
+        if not messages:
+            message = await subscription.get(settings.LONG_POLL_TIMEOUT)
+            messages = [message, *subscription.drain()] if message else []
+    if after:
+        messages = [m for m in messages if m['id'] > int(after)]
+    return JsonResponse({'notifications': messages}, status=status.HTTP_200_OK)
+